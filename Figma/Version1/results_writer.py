@@ -0,0 +1,124 @@
+import atexit
+import csv
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+try:
+    import fcntl
+except ImportError:  # Windows lab machines
+    fcntl = None
+    import msvcrt
+
+log = logging.getLogger(__name__)
+
+
+def _lock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def _unlock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class GroupCommitWriter:
+    """
+    Appends CSV rows from many request threads through one writer thread.
+
+    Rows are buffered until max_batch rows are waiting or max_delay seconds have
+    passed since the first one, then written in one locked append followed by fsync.
+    write() returns a Future that resolves once the rows are on disk. The file lock
+    lets several server processes share the same results file. on_commit(n_rows,
+    write_seconds, fsync_seconds) is called from the writer thread after each commit,
+    once its futures are resolved; an exception from it is logged, not raised.
+    """
+
+    def __init__(self, path, header, max_batch=256, max_delay=0.05, on_commit=None):
+        self.path = path
+        self.header = header
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.on_commit = on_commit
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="results-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, rows):
+        future = Future()
+        self._queue.put((rows, future))
+        return future
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            n_rows = len(item[0])
+            deadline = time.monotonic() + self.max_delay
+            closing = False
+            while n_rows < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    closing = True
+                    break
+                batch.append(item)
+                n_rows += len(item[0])
+            self._commit(batch)
+            if closing:
+                return
+
+    def _commit(self, batch):
+        n_rows = sum(len(rows) for rows, _ in batch)
+        try:
+            with open(self.path, 'a', newline='') as f:
+                _lock(f)
+                try:
+                    start = time.perf_counter()
+                    f.seek(0, os.SEEK_END)
+                    writer = csv.writer(f)
+                    # Write header only if the file is still empty
+                    if f.tell() == 0:
+                        writer.writerow(self.header)
+                    for rows, _ in batch:
+                        writer.writerows(rows)
+                    f.flush()
+                    written = time.perf_counter()
+                    os.fsync(f.fileno())
+                    synced = time.perf_counter()
+                finally:
+                    _unlock(f)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for _, future in batch:
+            future.set_result(None)
+        if self.on_commit is not None:
+            try:
+                self.on_commit(n_rows, written - start, synced - written)
+            except Exception:
+                log.exception("on_commit failed after committing %d rows", n_rows)
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
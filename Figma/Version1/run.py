@@ -1,35 +1,80 @@
-from flask import Flask, request, jsonify
-import csv
 import os
+import sys
+
+from flask import Flask, request, jsonify
+
+from results_writer import GroupCommitWriter
+
+# Shared request instrumentation lives with the DFT service
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Version2'))
+from request_metrics import RequestMetrics  # noqa: E402
 
 app = Flask(__name__)
 
+RESULTS_FILE = 'I4Game_results.csv'
+FIELDS = ['trial_number', 'payoff_A_event1', 'payoff_A_event2',
+          'payoff_B_event1', 'payoff_B_event2', 'choice',
+          'chosen_payoff', 'current_amount', 'time_taken']
+
+# Request and stage latencies are served on /metrics; requests slower than
+# SLOW_REQUEST_SECONDS are logged to SLOW_REQUEST_LOG (printed if None)
+SLOW_REQUEST_SECONDS = 1.0
+SLOW_REQUEST_LOG = None
+
+metrics = RequestMetrics('results_service', slow_seconds=SLOW_REQUEST_SECONDS, slow_log=SLOW_REQUEST_LOG)
+metrics.install(app)
+
+def _record_commit(n_rows, write_seconds, fsync_seconds):
+    metrics.observe_stage('csv_write', write_seconds)
+    metrics.observe_stage('csv_flush', fsync_seconds)
+
+# One writer thread appends rows for every request, a batch at a time
+writer = GroupCommitWriter(RESULTS_FILE, FIELDS, max_batch=256, max_delay=0.05, on_commit=_record_commit)
+
+def _row(data):
+    if not isinstance(data, dict):
+        raise TypeError(f"each trial must be an object, got {type(data).__name__}")
+    return [data[field] for field in FIELDS]
+
+def _bad_request(e):
+    metrics.record_error(e)
+    message = f"missing field {e}" if isinstance(e, KeyError) else str(e)
+    return jsonify({"status": "error", "error": message}), 400
+
 @app.route('/save_results', methods=['POST'])
 def save_results():
-    data = request.json
-
-    # Check if the CSV file exists, and write headers if it doesn't
-    file_exists = os.path.isfile('I4Game_results.csv')
-
-    with open('I4Game_results.csv', 'a', newline='') as f:
-        writer = csv.writer(f)
-        # Write header only if the file did not exist before
-        if not file_exists:
-            writer.writerow(['trial_number', 'payoff_A_event1', 'payoff_A_event2',
-                             'payoff_B_event1', 'payoff_B_event2', 'choice',
-                             'chosen_payoff', 'current_amount', 'time_taken'])
-
-        # Record the data
-        row_data = [data['trial_number'], data['payoff_A_event1'], data['payoff_A_event2'],
-                    data['payoff_B_event1'], data['payoff_B_event2'], data['choice'],
-                    data['chosen_payoff'], data['current_amount'], data['time_taken']]
-        
-        writer.writerow(row_data)
-        
-        # Display the data in the terminal
-        print("Data saved:", row_data)
+    with metrics.span('json_decode'):
+        data = request.json
+
+    try:
+        row_data = _row(data)
+    except (KeyError, TypeError) as e:
+        return _bad_request(e)
+
+    # Returns once the row is on disk
+    with metrics.span('commit_wait'):
+        writer.write([row_data]).result()
     
     return jsonify({"status": "success"})
 
+@app.route('/save_results_batch', methods=['POST'])
+def save_results_batch():
+    with metrics.span('json_decode'):
+        trials = request.json
+
+    try:
+        if not isinstance(trials, list):
+            raise TypeError(f"body must be a list of trials, got {type(trials).__name__}")
+        rows = [_row(data) for data in trials]
+    except (KeyError, TypeError) as e:
+        return _bad_request(e)
+
+    with metrics.span('commit_wait'):
+        writer.write(rows).result()
+
+    return jsonify({"status": "success", "saved": len(rows)})
+
 if __name__ == "__main__":
-    app.run(debug=True)
+    # No reloader by default: it runs the app in a second process with its own writer
+    # thread. Set FLASK_DEBUG=1 for local debugging only.
+    app.run(debug=os.environ.get("FLASK_DEBUG") == "1")
@@ -0,0 +1,70 @@
+import csv
+import threading
+
+import pytest
+
+from results_writer import GroupCommitWriter
+from synthetic_data import generate_save_results_rows
+
+
+@pytest.fixture
+def results_service(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # run.py appends to RESULTS_FILE in the working directory
+    import run
+    return run
+
+
+def read_rows(path):
+    with open(path, newline="") as f:
+        return list(csv.reader(f))
+
+
+def test_concurrent_writes_are_grouped_and_all_durable(tmp_path):
+    commits = []
+    writer = GroupCommitWriter(str(tmp_path / "out.csv"), ["a", "b"], max_delay=0.05,
+                               on_commit=lambda n, write, fsync: commits.append(n))
+    futures = []
+
+    def client(k):
+        futures.extend(writer.write([[k, i]]) for i in range(20))
+
+    threads = [threading.Thread(target=client, args=(k,)) for k in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for future in futures:
+        future.result(timeout=5)
+    writer.close()
+
+    rows = read_rows(tmp_path / "out.csv")
+    assert rows[0] == ["a", "b"] and len(rows) == 101
+    assert sum(commits) == 100 and len(commits) < 100
+
+
+def test_failing_on_commit_does_not_stall_the_writer(tmp_path):
+    def on_commit(*args):
+        raise RuntimeError("metrics backend down")
+
+    writer = GroupCommitWriter(str(tmp_path / "out.csv"), ["a"], on_commit=on_commit)
+    assert writer.write([[1]]).result(timeout=5) is None
+    assert writer.write([[2]]).result(timeout=5) is None
+    writer.close()
+    assert read_rows(tmp_path / "out.csv") == [["a"], ["1"], ["2"]]
+
+
+def test_save_endpoints_append_rows(results_service, tmp_path):
+    client = results_service.app.test_client()
+    rows = generate_save_results_rows(3)
+    assert client.post("/save_results", json=rows[0]).status_code == 200
+    response = client.post("/save_results_batch", json=rows[1:])
+    assert response.get_json() == {"status": "success", "saved": 2}
+    saved = read_rows(tmp_path / results_service.RESULTS_FILE)
+    assert saved[0] == results_service.FIELDS
+    assert [int(row[0]) for row in saved[1:]] == [1, 2, 3]
+
+
+@pytest.mark.parametrize("body", [{"trial_number": 1}, [1, 2], [{"trial_number": 1}]])
+def test_malformed_batches_are_rejected(results_service, body):
+    response = results_service.app.test_client().post("/save_results_batch", json=body)
+    assert response.status_code == 400 and "error" in response.get_json()
@@ -0,0 +1,111 @@
+import hashlib
+import io
+import json
+
+import numpy as np
+
+# Request encodings of the pairing data, chosen by Content-Type:
+#   application/json                      list of trial objects (DFTModel._formatDataForR)
+#   application/vnd.pairing-columns+json  {"column": [values, ...], ...}
+#   application/x-npz                     numpy .npz archive, one array per column
+ROWS_JSON = "application/json"
+COLUMNS_JSON = "application/vnd.pairing-columns+json"
+NPZ = "application/x-npz"
+
+
+class PayloadError(ValueError):
+    """Raised for a request body that cannot be decoded into pairing data"""
+
+
+class UnsupportedPayload(PayloadError):
+    """Raised for a Content-Type the service cannot decode"""
+
+
+def _as_column(name, values):
+    column = np.asarray(values)
+    if column.ndim != 1:
+        raise ValueError(f"Column {name} must be one-dimensional, got shape {column.shape}")
+    if column.dtype == object:
+        try:
+            column = column.astype(np.float64)  # numbers with nulls
+        except (TypeError, ValueError):
+            return column.astype(str)
+    if column.dtype.kind in "biuf":
+        return column.astype(np.float64, copy=False)  # R numeric, and 1 hashes like 1.0
+    return column.astype(str)
+
+
+class TrialColumns:
+    """
+    Pairing data as one NumPy array per column (same column names as the trial rows).
+    Numeric columns are float64 and everything else strings, so they map straight onto
+    R numeric and character vectors.
+    """
+
+    def __init__(self, columns):
+        self.columns = {name: _as_column(name, values) for name, values in columns.items()}
+        lengths = {len(column) for column in self.columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+        self._n_rows = lengths.pop() if lengths else 0
+
+    def __len__(self):
+        return self._n_rows
+
+    def take(self, index):
+        """Subset of the rows (index array or boolean mask)"""
+        return TrialColumns({name: column[index] for name, column in self.columns.items()})
+
+    def content_hash(self):
+        digest = hashlib.sha256()
+        for name in sorted(self.columns):
+            column = np.ascontiguousarray(self.columns[name])
+            digest.update(f"{name}|{column.dtype.str}|".encode())
+            digest.update(column.tobytes())
+        return digest.hexdigest()
+
+    @classmethod
+    def from_rows(cls, rows):
+        names = list(dict.fromkeys(name for row in rows for name in row))
+        return cls({name: [row.get(name) for row in rows] for name in names})
+
+
+def participant_labels(column):
+    """participantid values as the strings used for rows (1.0 -> "1")"""
+    if column.dtype.kind == "f":
+        return [str(int(v)) if float(v).is_integer() else str(v) for v in column]
+    return [str(v) for v in column]
+
+
+def decode_pairing_data(mimetype, body):
+    """
+    Decode a request body in one of the encodings above
+    :return: list of row dicts for ROWS_JSON, TrialColumns otherwise
+    """
+    if mimetype not in (ROWS_JSON, COLUMNS_JSON, NPZ):
+        raise UnsupportedPayload(f"Unsupported Content-Type {mimetype!r}; use {ROWS_JSON}, {COLUMNS_JSON} or {NPZ}")
+    try:
+        if mimetype == ROWS_JSON:
+            rows = json.loads(body)
+            if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+                raise ValueError("JSON body must be a list of trial objects")
+            return rows
+        if mimetype == COLUMNS_JSON:
+            columns = json.loads(body)
+            if not isinstance(columns, dict):
+                raise ValueError("Columnar JSON must be an object of column arrays")
+            return TrialColumns(columns)
+        with np.load(io.BytesIO(body), allow_pickle=False) as archive:
+            return TrialColumns({name: archive[name] for name in archive.files})
+    except (ValueError, OSError, EOFError) as e:  # includes JSONDecodeError and bad zip archives
+        raise PayloadError(f"Invalid {mimetype} body: {e}") from e
+
+
+def encode_npz(columns, compressed=True):
+    """Body for an application/x-npz request from a dict of column arrays"""
+    arrays = {name: np.asarray(values) for name, values in columns.items()}
+    # Object arrays would need pickle, which the service refuses
+    arrays = {name: a.astype(str) if a.dtype == object else a for name, a in arrays.items()}
+    buffer = io.BytesIO()
+    (np.savez_compressed if compressed else np.savez)(buffer, **arrays)
+    return buffer.getvalue()
@@ -1,3 +1,6 @@
+// Columnar JSON body accepted by dft_service.py (see columnar.py)
+const COLUMNS_CONTENT_TYPE = 'application/vnd.pairing-columns+json';
+
 class DFTModel {
     constructor() {
         // Default parameters
@@ -11,14 +14,14 @@ class DFTModel {
 
     async estimateParameters(pairingData) {
         try {
-            // Convert pairing data to format expected by R
-            const formattedData = this._formatDataForR(pairingData);
+            // Convert pairing data to one array per column (much smaller than per-trial objects)
+            const formattedData = this._formatColumnsForR(pairingData);
             
             // Call Python service
             const response = await fetch('http://localhost:5000/estimate_dft', {
                 method: 'POST',
                 headers: {
-                    'Content-Type': 'application/json',
+                    'Content-Type': COLUMNS_CONTENT_TYPE,
                 },
                 body: JSON.stringify(formattedData)
             });
@@ -29,24 +32,7 @@ class DFTModel {
             
             const params = await response.json();
             
-            // Update model parameters
-            this.phi1 = params.phi1;
-            this.phi2 = params.phi2;
-            this.tau = 1 + Math.exp(Math.min(5, params.timesteps));
-            this.error_sd = params.error_sd;
-            this.beta_weights = [
-                params.b_energy,
-                params.b_pace,
-                params.b_safety,
-                params.b_reliability,
-                params.b_intelligence
-            ];
-            this.initial_P = [
-                params.asc_1,
-                params.asc_2,
-                params.asc_3,
-                0  // Neutral alternative
-            ];
+            this._applyParameters(params);
             
             return true;
             
@@ -56,6 +42,199 @@ class DFTModel {
         }
     }
 
+    async estimateParametersInBackground(pairingData, onProgress = null, pollMs = 1000) {
+        // Submit an estimation job and poll it, so the page is not blocked by one long request
+        try {
+            const submit = await fetch('http://localhost:5000/estimate_dft/jobs', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': COLUMNS_CONTENT_TYPE,
+                },
+                body: JSON.stringify(this._formatColumnsForR(pairingData))
+            });
+            if (!submit.ok) {
+                throw new Error(`HTTP error! status: ${submit.status}`);
+            }
+            const { job_id } = await submit.json();
+            this.currentJobId = job_id;
+            
+            while (true) {
+                const status = await (await fetch(`http://localhost:5000/estimate_dft/jobs/${job_id}`)).json();
+                if (onProgress && status.progress) {
+                    onProgress(status.progress);
+                }
+                if (status.status === 'done') {
+                    this._applyParameters(status.result);
+                    return true;
+                }
+                if (status.status === 'failed' || status.status === 'cancelled') {
+                    throw new Error(status.error || status.status);
+                }
+                await new Promise(resolve => setTimeout(resolve, pollMs));
+            }
+            
+        } catch (error) {
+            console.error("Error estimating parameters:", error);
+            return false;
+        } finally {
+            this.currentJobId = null;
+        }
+    }
+
+    async estimateParametersLive(pairingData, onIteration = null) {
+        // Like estimateParametersInBackground, but follows the optimizer through the job's
+        // server-sent events: onIteration gets each iteration's parameters and logLike
+        try {
+            const submit = await fetch('http://localhost:5000/estimate_dft/jobs', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': COLUMNS_CONTENT_TYPE,
+                },
+                body: JSON.stringify(this._formatColumnsForR(pairingData))
+            });
+            if (!submit.ok) {
+                throw new Error(`HTTP error! status: ${submit.status}`);
+            }
+            const { job_id } = await submit.json();
+            this.currentJobId = job_id;
+
+            const result = await new Promise((resolve, reject) => {
+                const events = new EventSource(`http://localhost:5000/estimate_dft/jobs/${job_id}/events`);
+                events.addEventListener('iteration', event => {
+                    if (onIteration) {
+                        onIteration(JSON.parse(event.data));
+                    }
+                });
+                events.addEventListener('done', event => {
+                    events.close();
+                    resolve(JSON.parse(event.data));
+                });
+                for (const status of ['failed', 'cancelled']) {
+                    events.addEventListener(status, event => {
+                        events.close();
+                        reject(new Error(JSON.parse(event.data).error));
+                    });
+                }
+                // Connection refused or lost (e.g. a server restart): EventSource would keep
+                // retrying forever, so stop here and let the caller poll or resubmit
+                events.onerror = () => {
+                    events.close();
+                    reject(new Error(`Lost the event stream of job ${job_id}`));
+                };
+            });
+            this._applyParameters(result);
+            return true;
+
+        } catch (error) {
+            console.error("Error estimating parameters:", error);
+            return false;
+        } finally {
+            this.currentJobId = null;
+        }
+    }
+
+    async estimateParametersByParticipant(pairingData, onParticipant = null) {
+        // Individual-level fits: one streamed JSON line per participant, then the combined table
+        try {
+            const response = await fetch('http://localhost:5000/estimate_dft/participants', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': COLUMNS_CONTENT_TYPE,
+                },
+                body: JSON.stringify(this._formatColumnsForR(pairingData))
+            });
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let table = null;
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) {
+                    break;
+                }
+                buffer += decoder.decode(value, { stream: true });
+                const lines = buffer.split('\n');
+                buffer = lines.pop();
+                for (const line of lines.filter(l => l.trim())) {
+                    const message = JSON.parse(line);
+                    if (message.table) {
+                        table = message.table;
+                    } else if (onParticipant) {
+                        onParticipant(message);
+                    }
+                }
+            }
+            return table;
+
+        } catch (error) {
+            console.error("Error estimating parameters:", error);
+            return null;
+        }
+    }
+
+    async predictChoice(candidateSets, participantId = null) {
+        // Choice probabilities and E_P per candidate set (each 3 robots x 5 attributes),
+        // from this participant's last estimate or else the current parameters
+        const params = {
+            asc_1: this.initial_P[0], asc_2: this.initial_P[1], asc_3: this.initial_P[2],
+            b_energy: this.beta_weights[0], b_pace: this.beta_weights[1], b_safety: this.beta_weights[2],
+            b_reliability: this.beta_weights[3], b_intelligence: this.beta_weights[4],
+            phi1: this.phi1, phi2: this.phi2, error_sd: this.error_sd,
+            // Inverse of tau = 1 + exp(timesteps); tau <= 1 would give -Infinity (sent as null)
+            timesteps: Math.log(Math.max(this.tau - 1, 1e-6))
+        };
+        try {
+            const response = await fetch('http://localhost:5000/predict_choice', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify(participantId === null
+                    ? { params, candidates: candidateSets }
+                    : { participantid: participantId, candidates: candidateSets })
+            });
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            return await response.json();
+
+        } catch (error) {
+            console.error("Error predicting choices:", error);
+            return null;
+        }
+    }
+
+    async cancelEstimation() {
+        if (this.currentJobId) {
+            await fetch(`http://localhost:5000/estimate_dft/jobs/${this.currentJobId}`, { method: 'DELETE' });
+        }
+    }
+
+    _applyParameters(params) {
+        // Update model parameters
+        this.phi1 = params.phi1;
+        this.phi2 = params.phi2;
+        this.tau = 1 + Math.exp(Math.min(5, params.timesteps));
+        this.error_sd = params.error_sd;
+        this.beta_weights = [
+            params.b_energy,
+            params.b_pace,
+            params.b_safety,
+            params.b_reliability,
+            params.b_intelligence
+        ];
+        this.initial_P = [
+            params.asc_1,
+            params.asc_2,
+            params.asc_3,
+            0  // Neutral alternative
+        ];
+    }
+
     _formatDataForR(pairingData) {
         // Convert to format expected by R script
         return pairingData.map(trial => ({
@@ -88,5 +267,15 @@ class DFTModel {
         }));
     }
 
+    _formatColumnsForR(pairingData) {
+        // Same columns as _formatDataForR, sent as {column: [values]} (columnar JSON)
+        const rows = this._formatDataForR(pairingData);
+        const columns = {};
+        for (const name of Object.keys(rows[0] || {})) {
+            columns[name] = rows.map(row => row[name]);
+        }
+        return columns;
+    }
+
     // ... rest of your DFTModel class remains the same ...
 }
\ No newline at end of file
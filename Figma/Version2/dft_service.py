@@ -1,164 +1,423 @@
-from flask import Flask, request, jsonify
-import rpy2.robjects as robjects
-from rpy2.robjects.packages import importr
-import pandas as pd
 import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+
+import numpy as np
+from flask import Flask, Response, request, jsonify
+
+from columnar import PayloadError, UnsupportedPayload, decode_pairing_data
+from estimate_cache import EstimateCache, cache_key
+from jobs import DONE, FAILED, CANCELLED, JobManager
+from participant_store import ParticipantStore, single_participant, split_by_participant
+from request_metrics import RequestMetrics
+from r_worker_pool import (APOLLO_BETA, APOLLO_FIXED, ITERATIONS_FILE, PARAM_NAMES, STOP_FILE, RWorkerPool,
+                           NotReady, PoolBusy, loglike_tolerance, read_iterations, request_stop,
+                           wait_for_estimate)
+
+# Choice predictions use the in-process DFT model, so they never wait for R
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..',
+                                'MATLAB_OptimaDFT_RobotAllocation'))
+from dft_estimator import plateau_rule, predict_choices  # noqa: E402
 
 app = Flask(__name__)
 
-# Load required R packages
-try:
-    apollo = importr('apollo')
-    base = importr('base')
-    stats = importr('stats')
-except Exception as e:
-    print(f"Error loading R packages: {e}")
+# R and Apollo are loaded once per worker process, not per request, on a background
+# thread at startup that also runs one warm-up estimation per worker. Fits run in
+# parallel across workers, so each one uses R_CORES_PER_WORKER cores (Apollo nCores).
+# Until the workers are warm, /estimate_dft answers from the cache or returns 503
+# (see /readyz), while background jobs wait up to JOB_WAIT_SECONDS.
+R_WORKERS = 4
+R_MAX_QUEUE = 16
+R_JOBS_PER_WORKER = 50
+R_CORES_PER_WORKER = 1
+
+# Estimates for identical (rows, model spec) pairs are reused; set CACHE_DIR to a
+# folder to keep them across service restarts
+CACHE_ENTRIES = 256
+CACHE_DIR = None
+
+# Background estimation jobs (/estimate_dft/jobs): how many may run at once, how long a
+# job may wait for a free R worker, and how long finished jobs can still be polled
+JOB_CONCURRENCY = R_WORKERS
+JOB_WAIT_SECONDS = 600
+JOB_KEEP_SECONDS = 3600
+
+# Known participants are re-fitted from their previous optimum and stopped once the
+# logLike moves by less than WARM_START_TOL between iterations; set PARTICIPANT_STORE
+# to a JSON file to keep the optima across restarts. Warm-started fits depend on where
+# they started, so only fits from APOLLO_BETA are cached
+WARM_START_TOL = 1e-3
+PARTICIPANT_STORE = None
+
+# Every fit is also stopped once its logLike has plateaued: moved by at most
+# PLATEAU_REL_TOL * |logLike| with no parameter moving more than PLATEAU_STEP_TOL
+# over the last PLATEAU_WINDOW iterations. Such estimates are returned with
+# stoppedEarly: true and are not cached. Clients can follow the iterations live on
+# /estimate_dft/jobs/<job_id>/events (server-sent events, polled every EVENTS_POLL_SECONDS)
+PLATEAU_REL_TOL = 5e-6
+PLATEAU_STEP_TOL = 1e-3
+PLATEAU_WINDOW = 5
+EVENTS_POLL_SECONDS = 0.5
+
+# Individual-level estimation (/estimate_dft/participants): participants fitted at once
+PARTICIPANT_FANOUT = R_WORKERS
+
+# Largest batch of candidate sets accepted by /predict_choice, and the decimals returned
+PREDICT_MAX_SETS = 10000
+PREDICT_DECIMALS = 6
+
+# Request and stage latencies are served on /metrics; requests slower than
+# SLOW_REQUEST_SECONDS are logged to SLOW_REQUEST_LOG (printed if None)
+SLOW_REQUEST_SECONDS = 5.0
+SLOW_REQUEST_LOG = None
+
+metrics = RequestMetrics('dft_service', slow_seconds=SLOW_REQUEST_SECONDS, slow_log=SLOW_REQUEST_LOG)
+metrics.install(app)
+
+def _record_r_timings(timings):
+    for stage, seconds in timings.items():
+        metrics.observe_stage(stage, seconds)
+
+pool = RWorkerPool(n_workers=R_WORKERS, max_queue=R_MAX_QUEUE, max_jobs_per_worker=R_JOBS_PER_WORKER,
+                   cores_per_worker=R_CORES_PER_WORKER, on_timings=_record_r_timings)
+cache = EstimateCache(max_entries=CACHE_ENTRIES, directory=CACHE_DIR)
+participants = ParticipantStore(PARTICIPANT_STORE)
+
+# Estimations currently running, so a re-post of the same data waits on the same fit.
+# Each fit runs on its own thread in a directory of its own rather than in a job's
+# work_dir, so cancelling one of its requesters does not stop it for the others.
+# _attached maps the work_dir of every job waiting on a fit to that fit, so the job's
+# progress and events follow it
+_inflight = {}
+_attached = {}
+_inflight_lock = threading.Lock()
+
+plateau = plateau_rule(rel_tol=PLATEAU_REL_TOL, step_tol=PLATEAU_STEP_TOL, window=PLATEAU_WINDOW)
+warm_start_converged = loglike_tolerance(WARM_START_TOL)
+
+class _SharedFit:
+    """One running estimation and the number of requests still waiting for it"""
+
+    def __init__(self, key):
+        self.key = key
+        self.future = Future()
+        self.fit_dir = tempfile.mkdtemp(prefix='dft_fit_')
+        self.requesters = 0
+        self.timings = None
+
+def _fit_uncached(pairing_data, work_dir, timeout):
+    """
+    Run Apollo, warm-starting from the participant's previous optimum when known
+    :return: (params, whether the fit started from APOLLO_BETA, R stage timings or None)
+    """
+    participant = single_participant(pairing_data)
+    previous = participants.get(participant) if participant is not None else None
+    if previous is None:
+        future = pool.estimate(pairing_data, work_dir, timeout=timeout)
+        params = wait_for_estimate(future, work_dir, plateau)
+    else:
+        future = pool.estimate(pairing_data, work_dir, start=previous['params'], timeout=timeout)
+        params = wait_for_estimate(future, work_dir, lambda rows: warm_start_converged(rows) or plateau(rows))
+    if participant is not None:
+        participants.update(participant, params, len(pairing_data))
+    return params, previous is None, future.timings
+
+def _fit(pairing_data, work_dir=None, timeout=None):
+    """Estimate through the cache, sharing the work with identical in-flight requests"""
+    with metrics.span('cache_lookup'):
+        key = cache_key(pairing_data, APOLLO_BETA, APOLLO_FIXED)
+        params = cache.get(key)
+    if params is not None:
+        return params
+
+    with _inflight_lock:
+        shared = _inflight.get(key)
+        owner = shared is None
+        if owner:
+            shared = _inflight[key] = _SharedFit(key)
+        shared.requesters += 1
+        if work_dir is not None:
+            _attached[work_dir] = shared
+    if owner:
+        threading.Thread(target=_run_shared, args=(shared, pairing_data, timeout),
+                         name='dft-fit', daemon=True).start()
+    params = _wait_shared(shared, work_dir)
+    # Recorded by the request that started the fit, so the R stages join its spans
+    if owner and shared.timings is not None:
+        _record_r_timings(shared.timings)
+    return params
+
+def _run_shared(shared, pairing_data, timeout):
+    """Run one shared fit and hand its result (or error) to every request waiting on it"""
+    try:
+        params, from_defaults, shared.timings = _fit_uncached(pairing_data, shared.fit_dir, timeout)
+        # The key covers the data and APOLLO_BETA, so only a full fit from there may be stored
+        if from_defaults and not params['stoppedEarly']:
+            cache.put(shared.key, params)
+    except Exception as e:
+        _release(shared)
+        shared.future.set_exception(e)
+    else:
+        _release(shared)
+        shared.future.set_result(params)
+
+def _release(shared):
+    """Copy a finished fit's iterations to the jobs waiting on it, then delete its directory"""
+    source = os.path.join(shared.fit_dir, ITERATIONS_FILE)
+    with _inflight_lock:
+        if _inflight.get(shared.key) is shared:
+            del _inflight[shared.key]
+        if os.path.isfile(source):
+            for job_dir, attached in _attached.items():
+                if attached is shared:
+                    shutil.copy(source, os.path.join(job_dir, ITERATIONS_FILE))
+        fit_dir, shared.fit_dir = shared.fit_dir, None
+    shutil.rmtree(fit_dir, ignore_errors=True)
+
+def _fit_dir(work_dir):
+    """Directory with the iterations of the fit serving the job in work_dir"""
+    with _inflight_lock:
+        shared = _attached.get(work_dir)
+        fit_dir = shared.fit_dir if shared is not None else None
+    return fit_dir or work_dir
+
+def _wait_shared(shared, work_dir):
+    """
+    Wait for a shared fit. Cancelling a job that waits on it only detaches the job;
+    the fit is stopped once no job or synchronous request is left waiting for it.
+    """
+    try:
+        if work_dir is None:
+            return shared.future.result()
+        while True:
+            try:
+                return shared.future.result(timeout=EVENTS_POLL_SECONDS)
+            except TimeoutError:
+                if os.path.exists(os.path.join(work_dir, STOP_FILE)):
+                    raise RuntimeError('Estimation cancelled')
+    finally:
+        with _inflight_lock:
+            _attached.pop(work_dir, None)
+            shared.requesters -= 1
+            if shared.requesters == 0 and shared.fit_dir is not None:
+                # Nobody wants the result any more: stop R, and let new requests start afresh
+                if _inflight.get(shared.key) is shared:
+                    del _inflight[shared.key]
+                request_stop(shared.fit_dir)
+
+def _run_job(pairing_data, work_dir):
+    return _fit(pairing_data, work_dir, timeout=JOB_WAIT_SECONDS)
+
+def _json_safe(values):
+    """NaN and inf (e.g. a diverging logLike) as null, since bare NaN is not valid JSON"""
+    return {k: None if isinstance(v, float) and not math.isfinite(v) else v for k, v in values.items()}
+
+def _job_progress(work_dir):
+    rows = read_iterations(_fit_dir(work_dir))
+    if not rows:
+        return None
+    return _json_safe({'iteration': len(rows) - 1, 'logLike': rows[-1].get('logLike')})
+
+jobs = JobManager(_run_job, progress=_job_progress, stop=request_stop,
+                  max_concurrent=JOB_CONCURRENCY, keep_seconds=JOB_KEEP_SECONDS)
+
+def _request_pairing_data():
+    """
+    The posted pairing data, decoded by Content-Type: trial rows (application/json) or
+    TrialColumns (application/vnd.pairing-columns+json or application/x-npz)
+    """
+    with metrics.span('payload_decode'):
+        return decode_pairing_data(request.mimetype, request.get_data())
+
+@app.errorhandler(PayloadError)
+def payload_error(e):
+    metrics.record_error(e)
+    return jsonify({'error': str(e)}), 415 if isinstance(e, UnsupportedPayload) else 400
 
 @app.route('/estimate_dft', methods=['POST'])
 def estimate_dft():
+    pairing_data = _request_pairing_data()
+
     try:
-        # Get JSON data from request
-        pairing_data = request.json
-        
-        # Convert to R dataframe
-        with robjects.local_context() as lc:
-            # Create R data frame
-            r_data = robjects.DataFrame(pairing_data)
-            
-            # Define Apollo model in R
-            robjects.r('''
-            estimate_dft <- function(df) {
-                ### Initialise code
-                apollo_initialise()
-                
-                ### Set core controls
-                apollo_control = list(
-                    modelName = "DFT_Resource_Allocation",
-                    modelDescr = "DFT model on robot selection with 5 attributes",
-                    indivID = "participantid",
-                    panelData = FALSE,
-                    nCores = 4
-                )
-                
-                ### Define model parameters
-                apollo_beta = c(
-                    asc_1 = 0, asc_2 = 0, asc_3 = 0,
-                    b_energy = 1,
-                    b_pace = 0,
-                    b_safety = 1,
-                    b_reliability = 0,
-                    b_intelligence = 1,
-                    phi1 = 1,
-                    phi2 = 0,
-                    error_sd = 1,
-                    timesteps = 1
-                )
-                
-                apollo_fixed = c("asc_3", "b_reliability")
-                
-                ### Define model
-                apollo_probabilities = function(apollo_beta, apollo_inputs, functionality="estimate") {
-                    apollo_attach(apollo_beta, apollo_inputs)
-                    on.exit(apollo_detach(apollo_beta, apollo_inputs))
-                    
-                    P = list()
-                    
-                    dft_settings = list(
-                        alternatives = c(alt1=1, alt2=2, alt3=3),
-                        avail = list(alt1=1, alt2=1, alt3=1),
-                        choiceVar = choice,
-                        attrValues = list(
-                            alt1 = list(
-                                energy = pmax(0.01, pmin(1, robot1energy)),
-                                pace = pmax(0.01, pmin(1, robot1pace)),
-                                safety = pmax(0.01, pmin(1, robot1safety)),
-                                reliability = pmax(0.01, pmin(1, robot1reliability)),
-                                intelligence = pmax(0.01, pmin(1, robot1intelligence))
-                            ),
-                            alt2 = list(
-                                energy = pmax(0.01, pmin(1, robot2energy)),
-                                pace = pmax(0.01, pmin(1, robot2pace)),
-                                safety = pmax(0.01, pmin(1, robot2safety)),
-                                reliability = pmax(0.01, pmin(1, robot2reliability)),
-                                intelligence = pmax(0.01, pmin(1, robot2intelligence))
-                            ),
-                            alt3 = list(
-                                energy = pmax(0.01, pmin(1, robot3energy)),
-                                pace = pmax(0.01, pmin(1, robot3pace)),
-                                safety = pmax(0.01, pmin(1, robot3safety)),
-                                reliability = pmax(0.01, pmin(1, robot3reliability)),
-                                intelligence = pmax(0.01, pmin(1, robot3intelligence))
-                            )
-                        ),
-                        altStart = list(alt1=asc_1, alt2=asc_2, alt3=asc_3),
-                        attrWeights = list(
-                            energy = exp(b_energy)),
-                            pace = exp(b_pace)),
-                            safety = exp(b_safety)),
-                            reliability = exp(b_reliability)),
-                            intelligence = exp(b_intelligence))
-                        ),
-                        attrScalings = 1,
-                        procPars = list(
-                            error_sd = pmax(0.1, error_sd)),
-                            timesteps = 1 + exp(pmin(5, timesteps)),
-                            phi1 = phi1,
-                            phi2 = phi2
-                        ),
-                        panelData = TRUE,
-                        componentName = "ResourceAllocationDFT"
-                    )
-                    
-                    P[["model"]] = apollo_dft(dft_settings, functionality)
-                    P = apollo_prepareProb(P, apollo_inputs, functionality)
-                    return(P)
-                }
-                
-                ### Estimate model
-                model = apollo_estimate(apollo_beta, apollo_fixed, apollo_probabilities, apollo_inputs)
-                
-                ### Return results
-                return(list(
-                    asc_1 = model$estimate["asc_1"],
-                    asc_2 = model$estimate["asc_2"],
-                    asc_3 = model$estimate["asc_3"],
-                    b_energy = model$estimate["b_energy"],
-                    b_pace = model$estimate["b_pace"],
-                    b_safety = model$estimate["b_safety"],
-                    b_reliability = model$estimate["b_reliability"],
-                    b_intelligence = model$estimate["b_intelligence"],
-                    phi1 = model$estimate["phi1"],
-                    phi2 = model$estimate["phi2"],
-                    error_sd = model$estimate["error_sd"],
-                    timesteps = model$estimate["timesteps"]
-                ))
-            }
-            ''')
-            
-            # Call the R function
-            estimate_dft = robjects.globalenv['estimate_dft']
-            results = estimate_dft(r_data)
-            
-            # Convert results to Python dict
-            params = {
-                'asc_1': results.rx2('asc_1')[0],
-                'asc_2': results.rx2('asc_2')[0],
-                'asc_3': results.rx2('asc_3')[0],
-                'b_energy': results.rx2('b_energy')[0],
-                'b_pace': results.rx2('b_pace')[0],
-                'b_safety': results.rx2('b_safety')[0],
-                'b_reliability': results.rx2('b_reliability')[0],
-                'b_intelligence': results.rx2('b_intelligence')[0],
-                'phi1': results.rx2('phi1')[0],
-                'phi2': results.rx2('phi2')[0],
-                'error_sd': results.rx2('error_sd')[0],
-                'timesteps': results.rx2('timesteps')[0]
-            }
-            
+        with metrics.span('estimate'):
+            params = _fit(pairing_data)
+        with metrics.span('serialization'):
             return jsonify(params)
-            
+
+    except (PoolBusy, NotReady) as e:
+        metrics.record_error(e)
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '5'}
+
     except Exception as e:
+        metrics.record_error(e)
         return jsonify({'error': str(e)}), 500
 
+@app.route('/estimate_dft/participants', methods=['POST'])
+def estimate_dft_participants():
+    """
+    Individual-level estimates: the rows are split by participantid and fitted in
+    parallel. Streams one JSON line per participant as it finishes, then a final
+    line with the combined table (sorted by participantid).
+    """
+    if not pool.is_ready():
+        return jsonify({'error': 'R workers are not ready', **pool.status()}), 503, {'Retry-After': '5'}
+    shards = split_by_participant(_request_pairing_data())
+
+    def stream():
+        table = []
+        with ThreadPoolExecutor(max_workers=PARTICIPANT_FANOUT) as fanout:
+            futures = {fanout.submit(_fit, rows, None, JOB_WAIT_SECONDS): (participant, len(rows))
+                       for participant, rows in shards.items()}
+            for future in as_completed(futures):
+                participant, n_rows = futures[future]
+                row = {'participantid': participant, 'nObs': n_rows}
+                try:
+                    row.update(future.result())
+                except Exception as e:
+                    row['error'] = str(e)
+                table.append(row)
+                yield json.dumps(row) + '\n'
+        yield json.dumps({'table': sorted(table, key=lambda r: r['participantid'])}) + '\n'
+
+    return Response(stream(), mimetype='application/x-ndjson')
+
+@app.route('/predict_choice', methods=['POST'])
+def predict_choice():
+    """
+    Choice probabilities and E_P for a batch of candidate sets.
+
+    Body: {"params": {...}} (missing names take their APOLLO_BETA value) or
+    {"participantid": ...} for the participant's last estimate, plus "candidates":
+    a list of sets, each 2 or 3 robots x 5 attributes (energy, pace, safety,
+    reliability, intelligence). Attributes are clipped to 0.01-1 as in the model.
+    """
+    with metrics.span('json_decode'):
+        body = request.get_json(silent=True) or {}
+    if 'params' in body:
+        params = body['params']
+    elif 'participantid' in body:
+        entry = participants.get(str(body['participantid']))
+        if entry is None:
+            return jsonify({'error': f"No estimate for participant {body['participantid']}"}), 404
+        params = entry['params']
+    else:
+        return jsonify({'error': 'Give either params or participantid'}), 400
+
+    try:
+        params = {**APOLLO_BETA, **params}
+        theta = np.array([params[name] for name in PARAM_NAMES], dtype=float)
+        M = np.asarray(body.get('candidates'), dtype=float)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid params or candidates: {e}'}), 400
+    if not np.all(np.isfinite(theta)):
+        bad = [name for name, value in zip(PARAM_NAMES, theta) if not np.isfinite(value)]
+        return jsonify({'error': f'Parameters must be finite: {", ".join(bad)}'}), 400
+    if M.ndim != 3 or M.shape[1] not in (2, 3) or M.shape[2] != 5 or not 0 < len(M) <= PREDICT_MAX_SETS:
+        return jsonify({'error': f'candidates must be 1-{PREDICT_MAX_SETS} sets of 2 or 3 robots '
+                                 f'x 5 attributes, got shape {list(M.shape)}'}), 400
+    if not np.all(np.isfinite(M)):
+        return jsonify({'error': 'candidates must be finite numbers'}), 400
+
+    try:
+        with metrics.span('predict'), np.errstate(all='ignore'):
+            probabilities, E_P = predict_choices(theta, np.clip(M, 0.01, 1))
+        if not (np.all(np.isfinite(probabilities)) and np.all(np.isfinite(E_P))):
+            raise ValueError('the model gives no finite choice probabilities for these parameters')
+    except (np.linalg.LinAlgError, ValueError) as e:
+        metrics.record_error(e)
+        return jsonify({'error': f'Cannot predict with these parameters: {e}'}), 400
+    # Rounded: short float reprs keep JSON encoding from dominating the latency
+    with metrics.span('serialization'):
+        return jsonify({'probabilities': probabilities.round(PREDICT_DECIMALS).tolist(),
+                        'E_P': E_P.round(PREDICT_DECIMALS).tolist(),
+                        'choice': (probabilities.argmax(axis=1) + 1).tolist()})
+
+@app.route('/estimate_dft/jobs', methods=['POST'])
+def submit_estimate_job():
+    job = jobs.submit(_request_pairing_data())
+    return jsonify({'job_id': job.job_id, 'status': job.status}), 202, \
+        {'Location': f'/estimate_dft/jobs/{job.job_id}'}
+
+@app.route('/estimate_dft/jobs/<job_id>', methods=['GET'])
+def estimate_job_status(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job.to_dict(jobs.progress(job)))
+
+@app.route('/estimate_dft/jobs/<job_id>/result', methods=['GET'])
+def estimate_job_result(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    if job.status == DONE:
+        return jsonify(job.result)
+    if job.status in (FAILED, CANCELLED):
+        return jsonify({'error': job.error or job.status, 'status': job.status}), 409
+    return jsonify({'status': job.status}), 202
+
+def _sse(event, data):
+    return f'event: {event}\ndata: {json.dumps(_json_safe(data))}\n\n'
+
+@app.route('/estimate_dft/jobs/<job_id>/events', methods=['GET'])
+def estimate_job_events(job_id):
+    """
+    Server-sent events for one job: an "iteration" event per optimizer iteration
+    (parameters, logLike and iteration number) as Apollo writes it, then one "done"
+    event with the result, or "failed" / "cancelled" with the error. A reconnecting
+    client's Last-Event-ID skips the iterations it has already seen.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    last_id = request.headers.get('Last-Event-ID', '')
+    seen = int(last_id) + 1 if last_id.isdigit() else 0
+
+    def stream():
+        nonlocal seen
+        while True:
+            finished = job.status in (DONE, FAILED, CANCELLED)
+            rows = read_iterations(_fit_dir(job.work_dir))
+            for iteration, row in enumerate(rows[seen:], start=seen):
+                yield f'id: {iteration}\n' + _sse('iteration', {'iteration': iteration, **row})
+            seen = max(seen, len(rows))
+            if finished:
+                break
+            time.sleep(EVENTS_POLL_SECONDS)
+        if job.status == DONE:
+            yield _sse('done', job.result)
+        else:
+            yield _sse(job.status, {'error': job.error or job.status})
+
+    return Response(stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+@app.route('/estimate_dft/jobs/<job_id>', methods=['DELETE'])
+def cancel_estimate_job(job_id):
+    if not jobs.cancel(job_id):
+        return jsonify({'error': 'Job not found or already finished'}), 404
+    return jsonify({'job_id': job_id, 'status': jobs.get(job_id).status})
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """Liveness: the web process is up (R may still be starting)"""
+    return jsonify({'status': 'alive'})
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Readiness: R and Apollo are loaded in every worker and the model code is warm"""
+    status = pool.status()
+    return jsonify(status), 200 if pool.is_ready() else 503
+
+@app.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    return jsonify(cache.stats())
+
 if __name__ == '__main__':
-    app.run(port=5000)
\ No newline at end of file
+    pool.start_warmup()
+    app.run(port=5000, threaded=True)
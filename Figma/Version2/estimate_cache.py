@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from columnar import TrialColumns
+
+
+def _canonical_value(value):
+    # 1 and 1.0 must hash the same; bools and strings are kept as they are
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return value
+
+
+def cache_key(pairing_data, apollo_beta, apollo_fixed):
+    """
+    Content hash of the formatted trial rows plus the model spec
+    :param pairing_data: list of trial dicts as produced by DFTModel._formatDataForR, or
+                         TrialColumns (hashed from the column bytes: columnar JSON and npz
+                         uploads of the same data share a key, trial rows do not)
+    """
+    if isinstance(pairing_data, TrialColumns):
+        rows = pairing_data.content_hash()
+    else:
+        rows = [{k: _canonical_value(v) for k, v in row.items()} for row in pairing_data]
+    payload = {
+        "rows": rows,
+        "apollo_beta": {k: float(v) for k, v in apollo_beta.items()},
+        "apollo_fixed": sorted(apollo_fixed),
+    }
+    text = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EstimateCache:
+    """
+    Parameter estimates keyed by cache_key, with LRU eviction in memory and an
+    optional directory of JSON files that survives service restarts.
+    """
+
+    def __init__(self, max_entries=256, directory=None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        if self.directory and os.path.isfile(self._path(key)):
+            with open(self._path(key)) as f:
+                params = json.load(f)
+            with self._lock:
+                self.disk_hits += 1
+                self._remember(key, params)
+            return params
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, params):
+        with self._lock:
+            self._remember(key, params)
+        if self.directory:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(params, f)
+            os.replace(tmp, path)
+
+    def _remember(self, key, params):
+        self._entries[key] = params
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "directory": self.directory,
+            }
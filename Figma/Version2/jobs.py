@@ -0,0 +1,117 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+
+class Job:
+    """One background estimation and everything a client may poll about it"""
+
+    def __init__(self, payload, work_dir):
+        self.job_id = uuid.uuid4().hex
+        self.payload = payload
+        self.work_dir = work_dir
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.cancel_requested = False
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.future = None
+
+    def to_dict(self, progress=None):
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "progress": progress,
+            "result": self.result,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class JobManager:
+    """
+    Runs jobs on a bounded thread pool so HTTP requests return immediately.
+    :param run: run(payload, work_dir) -> result dict, executed on a worker thread
+    :param progress: progress(work_dir) -> dict or None, read while the job runs
+    :param stop: stop(work_dir) asks a running job to stop early
+    :param max_concurrent: number of jobs allowed to run at the same time
+    :param keep_seconds: how long finished jobs stay available for polling
+    """
+
+    def __init__(self, run, progress=None, stop=None, max_concurrent=2, keep_seconds=3600):
+        self._run = run
+        self._progress = progress
+        self._stop = stop
+        self.keep_seconds = keep_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="dft-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, payload):
+        self._prune()
+        job = Job(payload, tempfile.mkdtemp(prefix="dft_job_"))
+        with self._lock:
+            self._jobs[job.job_id] = job
+        job.future = self._executor.submit(self._execute, job)
+        return job
+
+    def _execute(self, job):
+        if job.cancel_requested:
+            return
+        job.status = RUNNING
+        job.started = time.time()
+        try:
+            job.result = self._run(job.payload, job.work_dir)
+            job.status = DONE
+        except Exception as e:
+            job.error = str(e)
+            job.status = CANCELLED if job.cancel_requested else FAILED
+        finally:
+            job.finished = time.time()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def progress(self, job):
+        if self._progress is None or job.status == QUEUED:
+            return None
+        return self._progress(job.work_dir)
+
+    def cancel(self, job_id):
+        """Cancel a queued job, or ask a running one to stop; False if it already finished"""
+        job = self.get(job_id)
+        if job is None or job.status in (DONE, FAILED, CANCELLED):
+            return False
+        job.cancel_requested = True
+        if job.future.cancel():
+            job.status = CANCELLED
+            job.finished = time.time()
+        elif self._stop is not None:
+            self._stop(job.work_dir)
+        return True
+
+    def _prune(self):
+        cutoff = time.time() - self.keep_seconds
+        with self._lock:
+            expired = [j for j in self._jobs.values() if j.finished and j.finished < cutoff]
+            for job in expired:
+                del self._jobs[job.job_id]
+        for job in expired:
+            shutil.rmtree(job.work_dir, ignore_errors=True)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for job in list(self._jobs.values()):
+            if os.path.isdir(job.work_dir):
+                shutil.rmtree(job.work_dir, ignore_errors=True)
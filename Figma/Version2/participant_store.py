@@ -0,0 +1,85 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from columnar import TrialColumns, participant_labels
+
+
+def single_participant(pairing_data):
+    """The participantid shared by every row, or None for mixed or anonymous data"""
+    if isinstance(pairing_data, TrialColumns):
+        column = pairing_data.columns.get('participantid')
+        if column is None:
+            return None
+        ids = set(participant_labels(np.unique(column)))
+        ids = {None if participant in ('', 'nan', 'None') else participant for participant in ids}
+    else:
+        ids = {row.get('participantid') for row in pairing_data}
+    if len(ids) != 1:
+        return None
+    participant = ids.pop()
+    if participant in (None, '', 'anonymous'):
+        return None
+    return str(participant)
+
+
+def split_by_participant(pairing_data):
+    """Rows grouped by participantid, in order of first appearance"""
+    if isinstance(pairing_data, TrialColumns):
+        return _split_columns(pairing_data)
+    shards = {}
+    for row in pairing_data:
+        participant = row.get('participantid')
+        participant = 'anonymous' if participant in (None, '') else str(participant)
+        shards.setdefault(participant, []).append(row)
+    return shards
+
+
+def _split_columns(columns):
+    column = columns.columns.get('participantid')
+    if column is None:
+        return {'anonymous': columns} if len(columns) else {}
+    ids, first, inverse = np.unique(column, return_index=True, return_inverse=True)
+    labels = participant_labels(ids)
+    shards = {}
+    for k in np.argsort(first):
+        participant = labels[k]
+        participant = 'anonymous' if participant in ('', 'nan', 'None') else participant
+        index = np.flatnonzero(inverse == k)
+        if participant in shards:  # e.g. '' and a missing value both mean anonymous
+            index = np.sort(np.concatenate([shards[participant], index]))
+        shards[participant] = index
+    return {participant: columns.take(index) for participant, index in shards.items()}
+
+
+class ParticipantStore:
+    """
+    Last parameter estimate per participantid, used to warm-start the next fit.
+    :param path: optional JSON file the store is loaded from and saved to
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._entries = {}
+        self._lock = threading.Lock()
+        if path and os.path.isfile(path):
+            with open(path) as f:
+                self._entries = json.load(f)
+
+    def get(self, participant):
+        with self._lock:
+            return self._entries.get(participant)
+
+    def update(self, participant, params, n_rows):
+        entry = {'params': dict(params), 'n_rows': n_rows, 'updated': time.time()}
+        with self._lock:
+            self._entries[participant] = entry
+            if self.path:
+                tmp = f"{self.path}.tmp"
+                with open(tmp, 'w') as f:
+                    json.dump(self._entries, f)
+                os.replace(tmp, self.path)
+        return entry
@@ -0,0 +1,413 @@
+import csv
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+
+from columnar import TrialColumns
+
+# Model spec shared with R: starting values and fixed parameters
+APOLLO_BETA = {
+    "asc_1": 0, "asc_2": 0, "asc_3": 0,
+    "b_energy": 1,
+    "b_pace": 0,
+    "b_safety": 1,
+    "b_reliability": 0,
+    "b_intelligence": 1,
+    "phi1": 1,
+    "phi2": 0,
+    "error_sd": 1,
+    "timesteps": 1,
+}
+APOLLO_FIXED = ["asc_3", "b_reliability"]
+
+# Apollo writes one row per BFGS iteration here; creating STOP_FILE in the same
+# directory makes the next likelihood evaluation abort the estimation.
+ITERATIONS_FILE = "DFT_Resource_Allocation_iterations.csv"
+STOP_FILE = "STOP"  # same name as dft_stop_file in APOLLO_MODEL_R
+
+# Apollo model, defined once per worker process. estimate_dft(df, output_dir, start)
+# only validates the new data and runs apollo_estimate, from start if given (warm start)
+# or from apollo_beta. apollo_beta, apollo_fixed and apollo_ncores are set from Python.
+APOLLO_MODEL_R = '''
+apollo_initialise()
+dft_stop_file = ""
+
+### Set core controls
+apollo_control = list(
+    modelName = "DFT_Resource_Allocation",
+    modelDescr = "DFT model on robot selection with 5 attributes",
+    indivID = "participantid",
+    panelData = FALSE,
+    nCores = apollo_ncores
+)
+
+### Define model
+apollo_probabilities = function(apollo_beta, apollo_inputs, functionality="estimate") {
+    apollo_attach(apollo_beta, apollo_inputs)
+    on.exit(apollo_detach(apollo_beta, apollo_inputs))
+
+    if (functionality == "estimate" && file.exists(dft_stop_file)) stop("Estimation stopped")
+
+    P = list()
+
+    dft_settings = list(
+        alternatives = c(alt1=1, alt2=2, alt3=3),
+        avail = list(alt1=1, alt2=1, alt3=1),
+        choiceVar = choice,
+        attrValues = list(
+            alt1 = list(
+                energy = pmax(0.01, pmin(1, robot1energy)),
+                pace = pmax(0.01, pmin(1, robot1pace)),
+                safety = pmax(0.01, pmin(1, robot1safety)),
+                reliability = pmax(0.01, pmin(1, robot1reliability)),
+                intelligence = pmax(0.01, pmin(1, robot1intelligence))
+            ),
+            alt2 = list(
+                energy = pmax(0.01, pmin(1, robot2energy)),
+                pace = pmax(0.01, pmin(1, robot2pace)),
+                safety = pmax(0.01, pmin(1, robot2safety)),
+                reliability = pmax(0.01, pmin(1, robot2reliability)),
+                intelligence = pmax(0.01, pmin(1, robot2intelligence))
+            ),
+            alt3 = list(
+                energy = pmax(0.01, pmin(1, robot3energy)),
+                pace = pmax(0.01, pmin(1, robot3pace)),
+                safety = pmax(0.01, pmin(1, robot3safety)),
+                reliability = pmax(0.01, pmin(1, robot3reliability)),
+                intelligence = pmax(0.01, pmin(1, robot3intelligence))
+            )
+        ),
+        altStart = list(alt1=asc_1, alt2=asc_2, alt3=asc_3),
+        attrWeights = list(
+            energy = exp(b_energy),
+            pace = exp(b_pace),
+            safety = exp(b_safety),
+            reliability = exp(b_reliability),
+            intelligence = exp(b_intelligence)
+        ),
+        attrScalings = 1,
+        procPars = list(
+            error_sd = pmax(0.1, error_sd),
+            timesteps = 1 + exp(pmin(5, timesteps)),
+            phi1 = phi1,
+            phi2 = phi2
+        ),
+        panelData = TRUE,
+        componentName = "ResourceAllocationDFT"
+    )
+
+    P[["model"]] = apollo_dft(dft_settings, functionality)
+    P = apollo_prepareProb(P, apollo_inputs, functionality)
+    return(P)
+}
+
+estimate_dft <- function(df, output_dir, start = NULL) {
+    beta = if (is.null(start)) apollo_beta else start[names(apollo_beta)]
+    apollo_control$outputDirectory = output_dir
+    dft_stop_file <<- file.path(output_dir, "STOP")
+    apollo_inputs = apollo_validateInputs(apollo_beta = beta, apollo_fixed = apollo_fixed,
+                                          database = df, apollo_control = apollo_control)
+
+    ### Estimate model
+    model = apollo_estimate(beta, apollo_fixed, apollo_probabilities, apollo_inputs)
+
+    ### Return results
+    return(as.list(model$estimate))
+}
+'''
+
+PARAM_NAMES = list(APOLLO_BETA)
+
+
+class PoolBusy(Exception):
+    """Raised when every worker is busy and the request queue is full"""
+
+
+class NotReady(Exception):
+    """Raised when an estimation is requested before the workers have started and warmed up"""
+
+
+class RStartupError(Exception):
+    """Raised by a worker whose R or Apollo failed to load"""
+
+
+STARTING, READY, FAILED = "starting", "ready", "failed"
+
+
+class EstimateFuture(Future):
+    """Future for one estimation; timings holds its stage timings (seconds) once it succeeded"""
+
+    def __init__(self):
+        super().__init__()
+        self.timings = None
+
+
+def warmup_data(n_rows=30, seed=0):
+    """Small deterministic dataset in the pairing-data schema for warm-up estimations"""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    attributes = ["energy", "pace", "safety", "reliability", "intelligence"]
+    M = np.round(rng.uniform(0.3, 0.9, (n_rows, 3, len(attributes))), 2)
+    choice = (M @ np.array([0.3, 0.2, 0.4, 0.0, 0.5]) + rng.normal(0, 0.1, (n_rows, 3))).argmax(axis=1) + 1
+    rows = []
+    for n in range(n_rows):
+        row = {"participantid": "warmup", "trial": n + 1, "staketype": "low", "choice": int(choice[n])}
+        for i in range(3):
+            for k, attr in enumerate(attributes):
+                row[f"robot{i + 1}{attr}"] = float(M[n, i, k])
+        rows.append(row)
+    return rows
+
+
+# Per-process handle on the R estimate_dft function (set by _init_worker), the
+# start-up stage timings, reported with the first estimation of the process, and the
+# start-up error, kept so estimations can report why R is unavailable
+_estimate_dft = None
+_init_timings = None
+_init_error = None
+
+
+def _init_worker(n_cores=1):
+    """Start R, load Apollo and define the model once for this worker process"""
+    global _estimate_dft, _init_timings, _init_error
+    start = time.perf_counter()
+    try:
+        import rpy2.robjects as robjects
+        from rpy2.robjects.packages import importr
+
+        importr('apollo')
+        loaded = time.perf_counter()
+        robjects.globalenv['apollo_beta'] = _r_beta(APOLLO_BETA)
+        robjects.globalenv['apollo_fixed'] = robjects.StrVector(APOLLO_FIXED)
+        robjects.globalenv['apollo_ncores'] = robjects.IntVector([n_cores])
+        robjects.r(APOLLO_MODEL_R)
+        _estimate_dft = robjects.globalenv['estimate_dft']
+    except Exception as e:
+        _init_error = f"{type(e).__name__}: {e}"
+        return
+    _init_timings = {'r_start': loaded - start, 'r_define_model': time.perf_counter() - loaded}
+
+
+def _to_r_dataframe(pairing_data):
+    """
+    Convert the posted pairing data into an R data.frame: TrialColumns go column by
+    column through numpy2ri (numeric columns as one buffer copy each), trial dicts
+    through pandas
+    """
+    import rpy2.robjects as robjects
+    from rpy2.robjects import numpy2ri, pandas2ri
+    from rpy2.robjects.conversion import localconverter
+
+    if isinstance(pairing_data, TrialColumns):
+        with localconverter(robjects.default_converter + numpy2ri.converter):
+            columns = {name: robjects.conversion.py2rpy(column) for name, column in pairing_data.columns.items()}
+        return robjects.DataFrame(columns)
+    with localconverter(robjects.default_converter + pandas2ri.converter):
+        return robjects.conversion.py2rpy(pd.DataFrame(pairing_data))
+
+
+def _r_beta(params):
+    import rpy2.robjects as robjects
+
+    if params is None:
+        return robjects.NULL
+    beta = robjects.FloatVector([float(params[name]) for name in PARAM_NAMES])
+    beta.names = robjects.StrVector(PARAM_NAMES)
+    return beta
+
+
+def _run_estimate(pairing_data, output_dir=None, start=None):
+    """Fit in this worker; returns (params, stage timings in seconds)"""
+    global _init_timings
+    if _init_error is not None:
+        raise RStartupError(_init_error)
+    if output_dir is None:
+        with tempfile.TemporaryDirectory() as tmp:
+            return _run_estimate(pairing_data, tmp, start)
+    timings, _init_timings = dict(_init_timings or {}), None
+    t0 = time.perf_counter()
+    df = _to_r_dataframe(pairing_data)
+    t1 = time.perf_counter()
+    results = _estimate_dft(df, output_dir, _r_beta(start))
+    t2 = time.perf_counter()
+    params = {name: float(results.rx2(name)[0]) for name in PARAM_NAMES}
+    timings.update(r_dataframe=t1 - t0, apollo_estimate=t2 - t1, result_extraction=time.perf_counter() - t2)
+    return params, timings
+
+
+def read_iterations(output_dir):
+    """Rows written so far to Apollo's iterations file, as dicts of floats"""
+    path = os.path.join(output_dir, ITERATIONS_FILE)
+    if not os.path.isfile(path):
+        return []
+    with open(path, newline='') as f:
+        rows = []
+        for row in csv.DictReader(f):
+            try:
+                rows.append({k: float(v) for k, v in row.items()})
+            except (TypeError, ValueError):
+                break  # last line still being written
+        return rows
+
+
+def request_stop(output_dir):
+    """Ask the estimation writing to output_dir to stop at its next evaluation"""
+    open(os.path.join(output_dir, STOP_FILE), 'w').close()
+
+
+def loglike_tolerance(tol, min_iterations=3):
+    """Stopping rule: the logLike moved by less than tol over the last iteration"""
+    def should_stop(rows):
+        return len(rows) > min_iterations and abs(rows[-1]['logLike'] - rows[-2]['logLike']) < tol
+    return should_stop
+
+
+def wait_for_estimate(future, output_dir, should_stop=None, poll_seconds=0.5):
+    """
+    Wait for an estimation Future while watching its iterations file.
+
+    When should_stop(rows) returns True the fit is stopped through STOP_FILE and the
+    parameters of the last logged iteration are returned instead of Apollo's result.
+    :return: the params plus stoppedEarly, True when they come from the iterations file
+             rather than from a fit Apollo finished
+    """
+    stopped = False
+    while True:
+        try:
+            return {**future.result(timeout=poll_seconds), 'stoppedEarly': False}
+        except TimeoutError:
+            if should_stop is not None and not stopped and should_stop(read_iterations(output_dir)):
+                request_stop(output_dir)
+                stopped = True
+        except Exception:
+            rows = read_iterations(output_dir)
+            if not stopped or not rows:
+                raise
+            return {**{name: rows[-1][name] for name in PARAM_NAMES}, 'stoppedEarly': True}
+
+
+class RWorkerPool:
+    """
+    Pool of pre-initialized R processes for Apollo estimation.
+
+    rpy2 cannot run R concurrently inside one process, so each worker is its own
+    process with its own embedded R. Workers are replaced after max_jobs_per_worker
+    estimations to bound R memory growth, and at most n_workers + max_queue requests
+    are accepted at once; further submissions raise PoolBusy. cores_per_worker is
+    Apollo's nCores inside each worker; keep n_workers * cores_per_worker at or below
+    the number of cores. Every estimation reports its stage timings (R start-up, data
+    frame conversion, apollo_estimate, result extraction) on its EstimateFuture, so the
+    caller can record them in its own thread (e.g. inside the Flask request); the
+    warm-up estimations, which have no caller, go to on_timings(dict).
+
+    Estimations are only accepted once prewarm() (or the background start_warmup())
+    has started every worker and run one estimation in each; until then estimate()
+    waits up to its timeout and raises NotReady. Once the warm-up has failed it raises
+    NotReady straight away.
+    """
+
+    def __init__(self, n_workers=None, max_queue=16, max_jobs_per_worker=50, cores_per_worker=1,
+                 on_timings=None):
+        self.n_workers = n_workers or os.cpu_count()
+        self.max_queue = max_queue
+        self.on_timings = on_timings
+        self._executor = ProcessPoolExecutor(max_workers=self.n_workers, initializer=_init_worker,
+                                             initargs=(cores_per_worker,),
+                                             max_tasks_per_child=max_jobs_per_worker)
+        self._slots = threading.BoundedSemaphore(self.n_workers + max_queue)
+        self.state = STARTING
+        self.error = None
+        self.warmup_seconds = None
+        self._ready = threading.Event()
+        self._settled = threading.Event()  # warm-up finished, ready or failed
+        self._warmup_lock = threading.Lock()
+
+    def submit(self, fn, *args, timeout=None):
+        """Queue fn(*args) on a worker; returns a Future or raises PoolBusy"""
+        acquired = self._slots.acquire(timeout=timeout) if timeout else self._slots.acquire(blocking=False)
+        if not acquired:
+            raise PoolBusy(f"All {self.n_workers} R workers are busy and {self.max_queue} requests are queued")
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def estimate(self, pairing_data, output_dir=None, start=None, timeout=None):
+        """
+        Submit one Apollo estimation (optionally warm-started)
+        :return: EstimateFuture resolving to the params, with the stage timings in .timings
+        """
+        self._settled.wait(timeout or 0)
+        if not self._ready.is_set():
+            if self.state == FAILED:
+                raise NotReady(f"R workers failed to start: {self.error}")
+            raise NotReady("R workers are still starting")
+        inner = self.submit(_run_estimate, pairing_data, output_dir, start, timeout=timeout)
+        outer = EstimateFuture()
+
+        def unpack(done):
+            try:
+                params, timings = done.result()
+            except BaseException as e:
+                outer.set_exception(e)
+                return
+            outer.timings = timings
+            outer.set_result(params)
+
+        inner.add_done_callback(unpack)
+        return outer
+
+    def prewarm(self, sample_data=None):
+        """
+        Start every worker (and R inside it) and run one estimation per worker so the
+        model code is warm before the first request; sets the pool ready. A failed
+        warm-up fit still counts as warm, but workers that cannot start R mark the
+        pool failed.
+        :return: the pool state
+        """
+        with self._warmup_lock:
+            if self.state != STARTING:
+                return self.state
+            sample_data = warmup_data() if sample_data is None else sample_data
+            start = time.perf_counter()
+            futures = [self.submit(_run_estimate, sample_data, timeout=None) for _ in range(self.n_workers)]
+            wait(futures)
+            errors = [f.exception() for f in futures if f.exception() is not None]
+            if self.on_timings is not None:
+                for future in futures:
+                    if future.exception() is None:
+                        self.on_timings(future.result()[1])
+            broken = [e for e in errors if isinstance(e, (RStartupError, BrokenProcessPool))]
+            if broken:
+                self.state, self.error = FAILED, str(broken[0])
+            else:
+                self.state, self.error = READY, str(errors[0]) if errors else None
+                self.warmup_seconds = time.perf_counter() - start
+                self._ready.set()
+            self._settled.set()
+            return self.state
+
+    def start_warmup(self, sample_data=None):
+        """Run prewarm on a background thread so the caller (e.g. the web server) is not blocked"""
+        thread = threading.Thread(target=self.prewarm, args=(sample_data,), name="r-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def is_ready(self):
+        return self._ready.is_set()
+
+    def status(self):
+        return {'state': self.state, 'workers': self.n_workers, 'warmup_seconds': self.warmup_seconds,
+                'error': self.error}
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,152 @@
+import bisect
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, g, has_request_context, request
+
+# Upper bounds (seconds) of the latency histogram buckets; estimations can take minutes
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+_HELP = {
+    "http_requests_total": ("counter", "Requests by endpoint, method and status"),
+    "http_request_bytes_total": ("counter", "Request payload bytes by endpoint"),
+    "http_request_duration_seconds": ("histogram", "Time from request start to response by endpoint"),
+    "stage_duration_seconds": ("histogram", "Time spent in each processing stage"),
+    "errors_total": ("counter", "Exceptions turned into error responses, by endpoint and type"),
+}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels, extra=None):
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+class RequestMetrics:
+    """
+    Request and per-stage latency histograms plus counters, served on /metrics in the
+    Prometheus text format (no prometheus_client needed).
+
+    install(app) times every request. Inside a request, `with metrics.span(stage)`
+    times one stage; observe_stage() records stages measured elsewhere (worker
+    processes, writer threads). Requests slower than slow_seconds are logged with their
+    payload size and spans, as JSON lines appended to slow_log (printed if None).
+    """
+
+    def __init__(self, namespace, buckets=LATENCY_BUCKETS, slow_seconds=None, slow_log=None):
+        self.namespace = namespace
+        self.buckets = tuple(buckets)
+        self.slow_seconds = slow_seconds
+        self.slow_log = slow_log
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            hist[0][bisect.bisect_left(self.buckets, seconds)] += 1
+            hist[1] += seconds
+
+    def observe_stage(self, stage, seconds):
+        """Record a stage duration; inside a request it is also kept for the slow-request log"""
+        self.observe("stage_duration_seconds", seconds, stage=stage)
+        if has_request_context() and "metrics_spans" in g:
+            g.metrics_spans.append((stage, seconds))
+
+    @contextmanager
+    def span(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(stage, time.perf_counter() - start)
+
+    def record_error(self, error):
+        self.inc("errors_total", endpoint=_endpoint(), type=type(error).__name__)
+
+    def render(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: ([*counts], total) for key, (counts, total) in self._histograms.items()}
+
+        lines = []
+        for name, (kind, help_text) in _HELP.items():
+            full = f"{self.namespace}_{name}"
+            series = counters if kind == "counter" else histograms
+            keys = sorted(key for key in series if key[0] == name)
+            if not keys:
+                continue
+            lines += [f"# HELP {full} {help_text}", f"# TYPE {full} {kind}"]
+            for key in keys:
+                labels = key[1]
+                if kind == "counter":
+                    lines.append(f"{full}{_labels(labels)} {series[key]}")
+                    continue
+                counts, total = series[key]
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(float(bound))
+                    lines.append(f"{full}_bucket{_labels(labels, ('le', le))} {cumulative}")
+                lines.append(f"{full}_sum{_labels(labels)} {total!r}")
+                lines.append(f"{full}_count{_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def install(self, app):
+        """Time every request of a Flask app and add the /metrics endpoint"""
+
+        @app.before_request
+        def _start_request():
+            g.metrics_start = time.perf_counter()
+            g.metrics_spans = []
+
+        @app.after_request
+        def _finish_request(response):
+            if "metrics_start" not in g:
+                return response
+            elapsed = time.perf_counter() - g.metrics_start
+            endpoint = _endpoint()
+            payload = request.content_length or 0
+            self.observe("http_request_duration_seconds", elapsed, endpoint=endpoint)
+            self.inc("http_requests_total", endpoint=endpoint, method=request.method,
+                     status=str(response.status_code))
+            self.inc("http_request_bytes_total", payload, endpoint=endpoint)
+            if self.slow_seconds is not None and elapsed >= self.slow_seconds:
+                self._log_slow(elapsed, response.status_code, payload)
+            return response
+
+        app.add_url_rule("/metrics", "metrics",
+                         lambda: Response(self.render(), mimetype="text/plain; version=0.0.4"))
+
+    def _log_slow(self, elapsed, status, payload):
+        entry = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "method": request.method, "path": request.path,
+                 "status": status, "seconds": round(elapsed, 6), "payload_bytes": payload,
+                 "spans": [[stage, round(seconds, 6)] for stage, seconds in g.metrics_spans]}
+        line = json.dumps(entry)
+        if self.slow_log is None:
+            print(f"Slow request: {line}")
+            return
+        with self._lock, open(self.slow_log, "a") as f:
+            f.write(line + "\n")
+
+
+def _endpoint():
+    """URL rule of the current request, so /jobs/<job_id> is one series"""
+    rule = request.url_rule
+    return rule.rule if rule is not None else "unmatched"
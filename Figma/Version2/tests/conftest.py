@@ -0,0 +1,87 @@
+import csv
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, os.path.join(HERE, "..", "..", "..", "benchmarks"))
+
+import dft_service  # noqa: E402
+from estimate_cache import EstimateCache  # noqa: E402
+from participant_store import ParticipantStore  # noqa: E402
+from r_worker_pool import APOLLO_BETA, ITERATIONS_FILE, STOP_FILE, EstimateFuture  # noqa: E402
+
+
+class FakePool:
+    """
+    Stands in for RWorkerPool without R: each estimation appends one row per step
+    seconds to the iterations file, like Apollo, and aborts once STOP_FILE exists
+    :param loglike: loglike(iteration) written to the iterations file
+    """
+
+    def __init__(self, iterations=6, step=0.02, loglike=lambda i: -100.0 + i, result=None):
+        self.iterations = iterations
+        self.step = step
+        self.loglike = loglike
+        self.result = {**APOLLO_BETA, "phi1": 0.5} if result is None else result
+        self.starts = []
+
+    @property
+    def calls(self):
+        return len(self.starts)
+
+    def is_ready(self):
+        return True
+
+    def status(self):
+        return {"state": "ready"}
+
+    def estimate(self, pairing_data, output_dir=None, start=None, timeout=None):
+        self.starts.append(start)
+        future = EstimateFuture()
+        threading.Thread(target=self._run, args=(future, output_dir), daemon=True).start()
+        return future
+
+    def _run(self, future, output_dir):
+        path = os.path.join(output_dir, ITERATIONS_FILE)
+        for i in range(self.iterations):
+            if os.path.exists(os.path.join(output_dir, STOP_FILE)):
+                future.set_exception(RuntimeError("Estimation stopped"))
+                return
+            row = {**APOLLO_BETA, "logLike": self.loglike(i)}
+            with open(path, "a", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=list(row))
+                if i == 0:
+                    writer.writeheader()
+                writer.writerow(row)
+            time.sleep(self.step)
+        future.timings = {"apollo_estimate": self.iterations * self.step}
+        future.set_result(dict(self.result))
+
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    """dft_service with a FakePool, an empty cache and participant store, and fast polling"""
+    pool = FakePool()
+    monkeypatch.setattr(dft_service, "pool", pool)
+    monkeypatch.setattr(dft_service, "cache", EstimateCache())
+    monkeypatch.setattr(dft_service, "participants", ParticipantStore())
+    monkeypatch.setattr(dft_service, "EVENTS_POLL_SECONDS", 0.05)
+    return pool
+
+
+@pytest.fixture
+def client():
+    return dft_service.app.test_client()
+
+
+@pytest.fixture
+def rows():
+    """Trial rows of one participant in the DFTModel._formatDataForR schema"""
+    from synthetic_data import generate_pairing_data
+
+    return generate_pairing_data(1, 5).to_dict(orient="records")
@@ -0,0 +1,47 @@
+import json
+
+import numpy as np
+import pytest
+
+from columnar import COLUMNS_JSON, NPZ, ROWS_JSON, PayloadError, TrialColumns, decode_pairing_data, encode_npz
+
+
+@pytest.fixture
+def columns(rows):
+    return {name: [row[name] for row in rows] for name in rows[0]}
+
+
+def test_encodings_decode_to_the_same_columns(rows, columns):
+    assert decode_pairing_data(ROWS_JSON, json.dumps(rows).encode()) == rows
+    from_json = decode_pairing_data(COLUMNS_JSON, json.dumps(columns).encode())
+    from_npz = decode_pairing_data(NPZ, encode_npz(columns))
+    assert len(from_json) == len(rows)
+    for name in columns:
+        np.testing.assert_array_equal(from_json.columns[name], from_npz.columns[name])
+    assert from_json.columns["choice"].dtype == np.float64
+    assert from_json.columns["staketype"].dtype.kind == "U"
+
+
+def test_numbers_with_nulls_stay_numeric():
+    column = TrialColumns({"robot1pace": [0.5, None, 1]}).columns["robot1pace"]
+    assert column.dtype == np.float64 and np.isnan(column[1])
+
+
+@pytest.mark.parametrize("mimetype, body", [
+    (ROWS_JSON, b'{"choice": 1}'),
+    (ROWS_JSON, b'[{"choice": 1}, 2]'),
+    (COLUMNS_JSON, b'{"choice": [1, 2], "trial": [1]}'),
+    (COLUMNS_JSON, b'{"choice": [[1], [2]]}'),
+    (NPZ, b"not a zip archive"),
+])
+def test_malformed_bodies_are_rejected(mimetype, body):
+    with pytest.raises(PayloadError):
+        decode_pairing_data(mimetype, body)
+
+
+def test_service_answers_bad_payloads_with_4xx(fake_pool, client):
+    assert client.post("/estimate_dft", data=b"a,b", content_type="text/csv").status_code == 415
+    for path in ("/estimate_dft", "/estimate_dft/jobs", "/estimate_dft/participants"):
+        response = client.post(path, data=b'{"choice": [1, 2], "trial": [1]}', content_type=COLUMNS_JSON)
+        assert response.status_code == 400 and "different lengths" in response.get_json()["error"]
+    assert fake_pool.calls == 0
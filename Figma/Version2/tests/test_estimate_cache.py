@@ -0,0 +1,64 @@
+import json
+
+import dft_service
+from columnar import COLUMNS_JSON, NPZ, decode_pairing_data, encode_npz
+from estimate_cache import EstimateCache, cache_key
+from r_worker_pool import APOLLO_BETA, APOLLO_FIXED
+
+
+def test_key_ignores_int_vs_float_but_not_the_model_spec():
+    rows = [{"choice": 1, "robot1energy": 0.5}]
+    assert cache_key(rows, APOLLO_BETA, APOLLO_FIXED) == cache_key([{"choice": 1.0, "robot1energy": 0.5}],
+                                                                   APOLLO_BETA, APOLLO_FIXED)
+    assert cache_key(rows, {**APOLLO_BETA, "phi1": 2}, APOLLO_FIXED) != cache_key(rows, APOLLO_BETA, APOLLO_FIXED)
+    assert cache_key(rows, APOLLO_BETA, ["asc_3"]) != cache_key(rows, APOLLO_BETA, APOLLO_FIXED)
+
+
+def test_columnar_json_and_npz_share_a_key(rows):
+    columns = {name: [row[name] for row in rows] for name in rows[0]}
+    from_json = decode_pairing_data(COLUMNS_JSON, json.dumps(columns).encode())
+    from_npz = decode_pairing_data(NPZ, encode_npz(columns))
+    assert cache_key(from_json, APOLLO_BETA, APOLLO_FIXED) == cache_key(from_npz, APOLLO_BETA, APOLLO_FIXED)
+
+
+def test_lru_eviction_and_disk_copy(tmp_path):
+    cache = EstimateCache(max_entries=2, directory=str(tmp_path))
+    for key in "abc":
+        cache.put(key * 8, {"phi1": ord(key)})
+    assert cache.stats()["entries"] == 2
+    assert cache.get("aaaaaaaa") == {"phi1": ord("a")}  # evicted from memory, read back from disk
+    assert cache.stats()["disk_hits"] == 1
+    assert EstimateCache(directory=str(tmp_path)).get("cccccccc") == {"phi1": ord("c")}
+    assert EstimateCache().get("cccccccc") is None
+
+
+def test_identical_posts_are_served_from_the_cache(fake_pool, client, rows):
+    first = client.post("/estimate_dft", json=rows)
+    second = client.post("/estimate_dft", json=rows)
+    assert first.status_code == second.status_code == 200
+    assert second.get_json() == first.get_json() and first.get_json()["stoppedEarly"] is False
+    assert fake_pool.calls == 1
+    assert client.get("/cache_stats").get_json()["hits"] == 1
+
+
+def test_columnar_post_hits_the_npz_entry(fake_pool, client, rows):
+    columns = {name: [row[name] for row in rows] for name in rows[0]}
+    client.post("/estimate_dft", data=encode_npz(columns), content_type=NPZ)
+    assert client.post("/estimate_dft", json=columns, content_type=COLUMNS_JSON).status_code == 200
+    assert fake_pool.calls == 1
+
+
+def test_plateau_stopped_fits_are_not_cached(fake_pool, client, rows, monkeypatch):
+    fake_pool.iterations, fake_pool.loglike = 200, lambda i: -100.0
+    monkeypatch.setattr(dft_service, "plateau", lambda iterations: len(iterations) >= 3)
+    for _ in range(2):
+        assert client.post("/estimate_dft", json=rows).get_json()["stoppedEarly"] is True
+    assert fake_pool.calls == 2
+
+
+def test_warm_started_fits_are_not_cached(fake_pool, client, rows):
+    dft_service.participants.update(str(rows[0]["participantid"]), {**APOLLO_BETA, "phi1": 3.0}, len(rows))
+    client.post("/estimate_dft", json=rows)
+    assert fake_pool.starts[0]["phi1"] == 3.0
+    client.post("/estimate_dft", json=rows)
+    assert fake_pool.calls == 2
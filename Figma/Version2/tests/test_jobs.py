@@ -0,0 +1,95 @@
+import json
+import threading
+import time
+
+import pytest
+
+import dft_service
+from jobs import CANCELLED, DONE, FAILED, JobManager
+
+
+def wait_until(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.01)
+
+
+def test_job_manager_runs_fails_and_cancels():
+    release = threading.Event()
+
+    def run(payload, work_dir):
+        if payload == "fail":
+            raise ValueError("bad data")
+        release.wait(5)
+        return {"payload": payload}
+
+    manager = JobManager(run, max_concurrent=1)
+    running, queued, failing = manager.submit("a"), manager.submit("b"), manager.submit("fail")
+    assert manager.cancel(queued.job_id)
+    assert queued.status == CANCELLED
+    release.set()
+    wait_until(lambda: failing.status == FAILED)
+    assert running.status == DONE and running.result == {"payload": "a"}
+    assert failing.error == "bad data"
+    assert not manager.cancel(running.job_id)
+    manager.shutdown()
+
+
+def test_job_reports_progress_and_result(fake_pool, client, rows):
+    fake_pool.iterations = 20
+    job_id = client.post("/estimate_dft/jobs", json=rows).get_json()["job_id"]
+    wait_until(lambda: client.get(f"/estimate_dft/jobs/{job_id}").get_json()["progress"] is not None)
+    wait_until(lambda: client.get(f"/estimate_dft/jobs/{job_id}").get_json()["status"] == DONE)
+    status = client.get(f"/estimate_dft/jobs/{job_id}").get_json()
+    assert status["progress"] == {"iteration": 19, "logLike": -81.0}
+    assert client.get(f"/estimate_dft/jobs/{job_id}/result").get_json()["phi1"] == 0.5
+
+
+def test_events_stream_iterations_with_nan_as_null(fake_pool, client, rows):
+    fake_pool.loglike = lambda i: float("nan") if i == 1 else -100.0 + i
+    job_id = client.post("/estimate_dft/jobs", json=rows).get_json()["job_id"]
+    body = client.get(f"/estimate_dft/jobs/{job_id}/events").get_data(as_text=True)
+    events = [block.split("\n") for block in body.strip().split("\n\n")]
+    iterations = [json.loads(lines[2][len("data: "):]) for lines in events if lines[1] == "event: iteration"]
+    assert [row["iteration"] for row in iterations] == list(range(fake_pool.iterations))
+    assert iterations[1]["logLike"] is None
+    assert events[-1][0] == "event: done"
+
+
+@pytest.mark.parametrize("cancel", ["owner", "attached"])
+def test_cancelling_one_requester_leaves_the_shared_fit_running(fake_pool, client, rows, cancel):
+    fake_pool.iterations = 30
+    owner = client.post("/estimate_dft/jobs", json=rows).get_json()["job_id"]
+    wait_until(lambda: dft_service._inflight)
+    attached = client.post("/estimate_dft/jobs", json=rows).get_json()["job_id"]
+    response = {}
+    sync = threading.Thread(target=lambda: response.update(r=client.post("/estimate_dft", json=rows)))
+    sync.start()
+    wait_until(lambda: client.get(f"/estimate_dft/jobs/{attached}").get_json()["progress"] is not None)
+
+    cancelled, other = (owner, attached) if cancel == "owner" else (attached, owner)
+    client.delete(f"/estimate_dft/jobs/{cancelled}")
+    sync.join(10)
+    assert response["r"].status_code == 200
+    wait_until(lambda: client.get(f"/estimate_dft/jobs/{other}").get_json()["status"] == DONE)
+    assert client.get(f"/estimate_dft/jobs/{cancelled}").get_json()["status"] == CANCELLED
+    assert client.get(f"/estimate_dft/jobs/{other}").get_json()["progress"]["iteration"] == 29
+    assert fake_pool.calls == 1
+
+
+def test_fit_stops_once_every_requester_cancelled(fake_pool, client, rows):
+    fake_pool.iterations = 500
+    first = client.post("/estimate_dft/jobs", json=rows).get_json()["job_id"]
+    wait_until(lambda: dft_service._inflight)
+    second = client.post("/estimate_dft/jobs", json=rows).get_json()["job_id"]
+    for job_id in (first, second):
+        client.delete(f"/estimate_dft/jobs/{job_id}")
+    wait_until(lambda: not dft_service._inflight)
+    for job_id in (first, second):
+        wait_until(lambda: client.get(f"/estimate_dft/jobs/{job_id}").get_json()["status"] == CANCELLED)
+    # The next post starts a fresh fit rather than joining the stopped one
+    fake_pool.iterations = 6
+    assert client.post("/estimate_dft", json=rows).status_code == 200
+    assert fake_pool.calls == 2
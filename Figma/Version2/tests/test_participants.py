@@ -0,0 +1,25 @@
+import json
+
+from participant_store import single_participant, split_by_participant
+
+
+def test_split_keeps_first_appearance_order_and_pools_anonymous_rows():
+    rows = [{"participantid": "b"}, {"participantid": ""}, {"participantid": "a"}, {"participantid": "b"}, {}]
+    shards = split_by_participant(rows)
+    assert list(shards) == ["b", "anonymous", "a"]
+    assert [len(shard) for shard in shards.values()] == [2, 2, 1]
+    assert single_participant(shards["b"]) == "b" and single_participant(rows) is None
+
+
+def test_participants_stream_one_line_each_then_the_table(fake_pool, client, rows):
+    body = [{**row, "participantid": participant} for participant in ("p2", "p1") for row in rows]
+    response = client.post("/estimate_dft/participants", json=body)
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert sorted(line["participantid"] for line in lines[:-1]) == ["p1", "p2"]
+    assert [row["participantid"] for row in lines[-1]["table"]] == ["p1", "p2"]
+    assert all(row["nObs"] == len(rows) and row["phi1"] == 0.5 for row in lines[-1]["table"])
+
+
+def test_participants_reject_rows_that_are_not_objects(fake_pool, client):
+    response = client.post("/estimate_dft/participants", json=[{"participantid": "p1"}, "p2"])
+    assert response.status_code == 400 and "trial objects" in response.get_json()["error"]
@@ -1,20 +1,114 @@
 import pandas as pd
+import csv
 import subprocess
 import os
+import tempfile
+import time
 import json  # Add this import
+import logging
 
-def estimate_parameters(csv_path, r_script_path="DFT_Resource_Allocation.R", output_dir="output"):
+import dft_estimator
+from pairing_loader import load_pairing_data
+
+log = logging.getLogger(__name__)
+
+# Apollo writes one row per BFGS iteration (parameters and logLike) to this file in
+# its output directory; it is polled every ITERATION_POLL_SECONDS while R runs
+ITERATIONS_FILE = "DFT_Resource_Allocation_iterations.csv"
+ITERATION_POLL_SECONDS = 0.5
+REPORTED_PARAMS = ["phi1", "phi2", "timesteps", "error_sd"]
+
+
+def _read_iterations(path):
+    """Rows written so far to Apollo's iterations file, as dicts of floats"""
+    if not os.path.isfile(path):
+        return []
+    with open(path, newline="") as f:
+        rows = []
+        for row in csv.DictReader(f):
+            try:
+                rows.append({k: float(v) for k, v in row.items()})
+            except (TypeError, ValueError):
+                break  # last line still being written
+        return rows
+
+
+def _run_apollo(r_script_path, iterations_path, on_iteration, stop_rule):
+    """
+    Run the R script, passing each new row of its iterations file to on_iteration.
+    When stop_rule(rows) fires, R is terminated.
+    :return: (stdout, stderr, returncode, rows) with rows None unless stopped early
     """
-    Run Apollo estimation on a dataset and return phi1, phi2, tau, and error_sd
+    # Apollo keeps the previous run's file until it writes the first new row
+    previous = os.stat(iterations_path).st_mtime_ns if os.path.isfile(iterations_path) else None
+    with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+        proc = subprocess.Popen(["Rscript", r_script_path], stdout=out, stderr=err)
+        seen = 0
+        stopped = None
+        while True:
+            finished = proc.poll() is not None
+            fresh = os.path.isfile(iterations_path) and os.stat(iterations_path).st_mtime_ns != previous
+            rows = _read_iterations(iterations_path) if fresh else []
+            for row in rows[seen:]:
+                if on_iteration is not None:
+                    on_iteration(row)
+            seen = max(seen, len(rows))
+            if finished:
+                break
+            if stop_rule is not None and rows and stop_rule(rows):
+                proc.terminate()
+                proc.wait()
+                stopped = rows
+                break
+            time.sleep(ITERATION_POLL_SECONDS)
+        out.seek(0)
+        err.seek(0)
+        return out.read().decode(), err.read().decode(), proc.returncode, stopped
+
+
+def estimate_parameters(csv_path, r_script_path="DFT_Resource_Allocation.R", output_dir="output", engine="apollo",
+                        on_iteration=None, stop_rule=None):
+    """
+    Run Apollo estimation on a dataset and return phi1, phi2, tau, and error_sd, plus
+    stoppedEarly (True when stop_rule ended the fit and the estimates are the last
+    iteration's, not a converged optimum)
     :param csv_path: Path to the user_choices CSV file (already saved by MATLAB)
+    :param engine: "apollo" runs the R script; "python" fits in-process with dft_estimator
+                   and also returns the asc_* and b_* estimates
+    :param on_iteration: on_iteration(row) with each iteration's parameters and logLike
+                         as the optimizer produces it
+    :param stop_rule: stop_rule(rows) -> bool over the iterations so far, e.g.
+                      dft_estimator.plateau_rule(); the fit stops early when it returns
+                      True and the last iteration's parameters are returned
     """
-    # Run the R script to estimate parameters
-    try:
-        result = subprocess.run(["Rscript", r_script_path], capture_output=True, check=True)
-        print("R script output:\n", result.stdout.decode())
-    except subprocess.CalledProcessError as e:
-        print("Error during R execution:\n", e.stderr.decode())
+    if engine == "python":
+        # Same filtering and clipping as DFT_Resource_Allocation.R before estimation
+        data = load_pairing_data(csv_path)
+        callback = None
+        if on_iteration is not None or stop_rule is not None:
+            rows = []
+
+            def callback(row):
+                rows.append(row)
+                if on_iteration is not None:
+                    on_iteration(row)
+                if stop_rule is not None and stop_rule(rows):
+                    raise StopIteration
+
+        result = dft_estimator.estimate(data, callback=callback)
+        return {**result["estimate"], "stoppedEarly": result["stoppedEarly"]}
+
+    # Run the R script to estimate parameters, following its iterations file
+    iterations_path = os.path.join(output_dir, ITERATIONS_FILE)
+    stdout, stderr, returncode, stopped = _run_apollo(r_script_path, iterations_path, on_iteration, stop_rule)
+    if stopped is not None:
+        params = {**{name: stopped[-1][name] for name in REPORTED_PARAMS}, "stoppedEarly": True}
+        log.info("Stopped at iteration %d on a logLike plateau (%.6f)", len(stopped) - 1, stopped[-1]["logLike"])
+        return params
+    if returncode != 0:
+        print("Error during R execution:\n", stderr)
         return None
+    print("R script output:\n", stdout)
 
     # Expected Apollo output
     result_file = os.path.join(output_dir, "DFT_Resource_Allocation_model.csv")
@@ -26,15 +120,15 @@ def estimate_parameters(csv_path, r_script_path="DFT_Resource_Allocation.R", out
     model_df = pd.read_csv(result_file)
 
     # Extract the desired parameter estimates
-    param_names = ["phi1", "phi2", "timesteps", "error_sd"]
     params = {}
-    for name in param_names:
+    for name in REPORTED_PARAMS:
         row = model_df[model_df["Name"] == name]
         if not row.empty:
             params[name] = float(row["Estimate"].values[0])
         else:
             raise KeyError(f"Parameter {name} not found in Apollo output.")
+    params["stoppedEarly"] = False
 
     # At the end of the function, BEFORE return:
     print(json.dumps(params))  # Add this line
-    return params  # Dictionary: {'phi1': ..., 'phi2': ..., 'timesteps': ..., 'error_sd': ...}
+    return params  # Dictionary: {'phi1': ..., 'phi2': ..., 'timesteps': ..., 'error_sd': ..., 'stoppedEarly': False}
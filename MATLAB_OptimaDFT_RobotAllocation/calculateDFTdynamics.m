@@ -103,7 +103,7 @@ end
         try
             % Add small diagonal noise to ensure positive definiteness
             V_P_stable = V_P + 1e-6 * eye(size(V_P));
-            R = chol(V_P); % Cholesky decomposition
+            R = chol(V_P_stable); % Cholesky decomposition
             Z = repmat(E_P,1,1e5) + R'*randn(J,1e5);
             [~,maxIdx] = max(Z);
             choice_probs = histcounts(maxIdx,1:J+1)'/1e5;
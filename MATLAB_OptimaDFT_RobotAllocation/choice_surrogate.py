@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from dft_dynamics import ATTRIBUTES
+from dft_estimator import predict_choices
+
+# Attribute range the model sees (values are clipped to it, as in the Apollo model)
+GRID_LOW, GRID_HIGH = 0.01, 1.0
+_CACHE_VERSION = "1"
+
+# The 2^5 corners of a grid cell, as 0/1 offsets per attribute
+_CORNERS = ((np.arange(2 ** len(ATTRIBUTES))[:, None] >> np.arange(len(ATTRIBUTES))) & 1).astype(bool)
+
+
+def _grid_points(levels):
+    axis = np.linspace(GRID_LOW, GRID_HIGH, levels)
+    mesh = np.meshgrid(*[axis] * len(ATTRIBUTES), indexing="ij")
+    return np.stack(mesh, axis=-1).reshape(-1, len(ATTRIBUTES))
+
+
+def _exact(theta, competitors, x, chunk=8192):
+    """P(choose candidate x) against the fixed competitors, straight from the DFT model"""
+    out = np.empty(len(x))
+    for start in range(0, len(x), chunk):
+        block = x[start:start + chunk]
+        M = np.empty((len(block), len(competitors) + 1, len(ATTRIBUTES)))
+        M[:, 0] = block
+        M[:, 1:] = competitors
+        out[start:start + chunk] = predict_choices(theta, M)[0][:, 0]
+    return out
+
+
+class ChoiceSurrogate:
+    """
+    Choice probability of a candidate robot as a function of its five attributes, for
+    one parameter set and fixed competitor robots, tabulated on a levels^5 float32 grid
+    over 0.01-1 and read back by multilinear interpolation.
+
+    The candidate is alternative 1 (asc_1) and the competitors alternatives 2 and 3.
+    validation holds the max/RMS error against the exact model at Sobol points.
+    """
+
+    def __init__(self, theta, competitors, values, validation=None):
+        self.theta = np.asarray(theta, dtype=float)
+        self.competitors = np.asarray(competitors, dtype=float)
+        self.values = values
+        self.levels = values.shape[0]
+        self.validation = validation
+
+    @classmethod
+    def build(cls, theta, competitors, levels=9, n_validation=1024, seed=0):
+        competitors = np.clip(np.asarray(competitors, dtype=float), GRID_LOW, GRID_HIGH)
+        values = _exact(theta, competitors, _grid_points(levels)).astype(np.float32)
+        surrogate = cls(theta, competitors, values.reshape((levels,) * len(ATTRIBUTES)))
+        surrogate.validation = surrogate.validate(n_validation, seed)
+        return surrogate
+
+    def validate(self, n_points=1024, seed=0):
+        """Interpolation error against the exact model at scrambled Sobol points"""
+        from scipy.stats import qmc
+
+        x = GRID_LOW + (GRID_HIGH - GRID_LOW) * qmc.Sobol(len(ATTRIBUTES), seed=seed).random(n_points)
+        err = self.lookup(x)[0] - _exact(self.theta, self.competitors, x)
+        return {"max_abs_error": float(np.abs(err).max()), "rms_error": float(np.sqrt((err ** 2).mean())),
+                "n_points": n_points}
+
+    def lookup(self, x):
+        """
+        Interpolated choice probability for one (5,) or many (Q x 5) attribute vectors.
+
+        The error bound is the spread of the 32 surrounding grid values; it bounds the
+        interpolation error wherever the probability is monotone in each attribute
+        within the cell, which holds away from strong similarity effects (large phi2).
+        :return: probability, error bound (floats for one vector, arrays for many)
+        """
+        x = np.asarray(x, dtype=float)
+        single = x.ndim == 1
+        pos = (np.clip(np.atleast_2d(x), GRID_LOW, GRID_HIGH) - GRID_LOW) / (GRID_HIGH - GRID_LOW) * (self.levels - 1)
+        base = np.minimum(pos.astype(int), self.levels - 2)
+        t = pos - base
+
+        idx = base[:, None, :] + _CORNERS  # Q x 32 x 5
+        corner_values = self.values[tuple(np.moveaxis(idx, -1, 0))]
+        weights = np.where(_CORNERS, t[:, None, :], 1 - t[:, None, :]).prod(axis=-1)
+        prob = (weights * corner_values).sum(axis=1)
+        bound = corner_values.max(axis=1) - corner_values.min(axis=1)
+        if single:
+            return float(prob[0]), float(bound[0])
+        return prob, bound
+
+
+def _cache_key(theta, competitors, levels):
+    ident = np.concatenate([np.asarray(theta, dtype=float).ravel(), np.asarray(competitors, dtype=float).ravel()])
+    return hashlib.sha1(ident.tobytes() + f"|{levels}|{_CACHE_VERSION}".encode()).hexdigest()
+
+
+def load_surrogate(theta, competitors, levels=9, cache_dir=None):
+    """
+    ChoiceSurrogate for this parameter set, read from cache_dir when it was built before.
+    The grid is stored as <key>.npy (float32) with its validation errors in <key>.json.
+    """
+    if cache_dir is None:
+        return ChoiceSurrogate.build(theta, competitors, levels)
+    competitors = np.clip(np.asarray(competitors, dtype=float), GRID_LOW, GRID_HIGH)
+    key = _cache_key(theta, competitors, levels)
+    values_path = os.path.join(cache_dir, key + ".npy")
+    meta_path = os.path.join(cache_dir, key + ".json")
+    if os.path.isfile(values_path) and os.path.isfile(meta_path):
+        with open(meta_path) as f:
+            validation = json.load(f)
+        return ChoiceSurrogate(theta, competitors, np.load(values_path), validation)
+
+    surrogate = ChoiceSurrogate.build(theta, competitors, levels)
+    os.makedirs(cache_dir, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=cache_dir, suffix=".npy", delete=False) as f:
+        np.save(f, surrogate.values)
+    os.replace(f.name, values_path)
+    with open(meta_path, "w") as f:
+        json.dump(surrogate.validation, f)
+    return surrogate
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    from dft_estimator import APOLLO_BETA, PARAM_NAMES
+
+    levels = int(sys.argv[1]) if len(sys.argv) > 1 else 9
+    theta = np.array([APOLLO_BETA[name] for name in PARAM_NAMES], dtype=float)
+    competitors = [[0.4, 0.5, 0.9, 0.6, 0.8], [0.7, 0.6, 0.6, 0.8, 0.9]]
+    start = time.perf_counter()
+    surrogate = ChoiceSurrogate.build(theta, competitors, levels)
+    print(f"{levels}^5 grid built in {time.perf_counter() - start:.2f} s "
+          f"({surrogate.values.nbytes / 1e3:.0f} kB), validation: {surrogate.validation}")
+    x = np.random.default_rng(0).uniform(GRID_LOW, GRID_HIGH, (1000, len(ATTRIBUTES)))
+    start = time.perf_counter()
+    surrogate.lookup(x)
+    print(f"1000 lookups in {1e3 * (time.perf_counter() - start):.2f} ms")
@@ -0,0 +1,135 @@
+import numpy as np
+
+from mvn_choice import mvn_choice_probabilities
+
+ATTRIBUTES = ["energy", "pace", "safety", "reliability", "intelligence"]
+
+
+def attribute_tensor(df, n_robots=3, attributes=ATTRIBUTES):
+    """
+    Stack the robot{i}{attr} columns of a pairing-data frame into an N x J x K array
+    :param df: DataFrame (or dict of columns) following testTrial_Resource_Allocation_AllPairing.csv
+    """
+    columns = [[f"robot{i}{attr}" for attr in attributes] for i in range(1, n_robots + 1)]
+    return np.stack([np.column_stack([np.asarray(df[c], dtype=float) for c in row])
+                     for row in columns], axis=1)
+
+
+def _power(x, tau):
+    """Real part of x**tau, so negative eigenvalues still work for non-integer tau"""
+    mag = np.abs(x) ** tau
+    return np.where(x < 0, mag * np.cos(np.pi * tau), mag)
+
+
+def _geometric(x, tau):
+    """sum_{r=0}^{tau-1} x**r = (1 - x**tau) / (1 - x), with the x -> 1 limit handled"""
+    near_one = np.abs(1 - x) < 1e-8
+    safe = np.where(near_one, 0.0, 1 - x)
+    series = tau + 0.5 * tau * (tau - 1) * (x - 1)
+    return np.where(near_one, series, (1 - _power(x, tau)) / np.where(near_one, 1.0, safe))
+
+
+def dft_matrices(phi1, phi2, epsilon, beta, M, w=None):
+    """
+    Build the per-trial DFT building blocks for a stack of trials
+    :param M: attribute values [N trials x J alternatives x K attributes] (or J x K)
+    :return: S (N x J x J), mu (N x J), Phi (N x J x J)
+    """
+    M = np.asarray(M, dtype=float)
+    if M.ndim == 2:
+        M = M[None]
+    N, J, K = M.shape
+    beta = np.broadcast_to(np.asarray(beta, dtype=float).ravel(), (K,))
+    if w is None:
+        w = np.ones(K) / K  # Uniform attention weights if not provided
+    else:
+        w = np.asarray(w, dtype=float).ravel()
+        w = w / w.sum()
+
+    # 1. Scale attributes by beta coefficients
+    M_scaled = M * beta
+
+    # 2. Contrast matrix C (J x J)
+    C = np.eye(J) - np.ones((J, J)) / J
+
+    # 3-4. Squared distances and feedback matrix S
+    diff = M_scaled[:, :, None, :] - M_scaled[:, None, :, :]
+    D2 = np.einsum("nijk,nijk->nij", diff, diff)
+    S = np.eye(J) - phi2 * np.exp(-phi1 * D2)
+
+    # 5. Mean valence mu = C M w
+    CM = np.einsum("ij,njk->nik", C, M_scaled)
+    mu = CM @ w
+
+    # 6. Valence covariance Phi = C M Psi M' C' + eps^2 I
+    Psi = np.diag(w) - np.outer(w, w)
+    Phi = CM @ Psi @ CM.transpose(0, 2, 1) + epsilon ** 2 * np.eye(J)
+    return S, mu, Phi
+
+
+def preference_moments(phi1, phi2, tau, epsilon, beta, M, initial_P=None, w=None):
+    """
+    Expected preference E_P and covariance V_P after tau steps for every trial at once.
+
+    S is symmetric, so with S = Q diag(lam) Q' both moments have closed forms in the
+    eigenbasis and the cost does not depend on tau:
+        E_P = Q [g(lam) * Q'mu + lam^tau * Q'P0],     g(x) = (1 - x^tau) / (1 - x)
+        V_P = Q [(Q' Phi Q) * g(lam_i lam_j)] Q'      (= sum_r S^r Phi S'^r)
+    :param tau: number of preference updating steps (non-integer values are allowed)
+    :return: E_P (N x J), V_P (N x J x J)
+    """
+    S, mu, Phi = dft_matrices(phi1, phi2, epsilon, beta, M, w)
+    N, J = mu.shape
+    if initial_P is None:
+        initial_P = np.zeros(J)  # Default zero initial preferences
+    P0 = np.broadcast_to(np.asarray(initial_P, dtype=float), (N, J))
+
+    lam, Q = np.linalg.eigh(S)
+    Qt = Q.transpose(0, 2, 1)
+    nu = np.einsum("nji,nj->ni", Q, mu)
+    pi0 = np.einsum("nji,nj->ni", Q, P0)
+    E_P = np.einsum("nij,nj->ni", Q, _geometric(lam, tau) * nu + _power(lam, tau) * pi0)
+
+    H = _geometric(lam[:, :, None] * lam[:, None, :], tau)
+    V_P = Q @ ((Qt @ Phi @ Q) * H) @ Qt
+    return E_P, V_P
+
+
+def choice_probabilities(E_P, V_P, epsilon, n_draws=256, seed=0):
+    """
+    Choice probabilities per trial, following calculateDFTdynamics:
+    softmax of the centred preferences for J <= 4, MVN integration otherwise
+    (GHK with fixed Sobol draws on the stabilised covariance, see mvn_choice.py)
+    """
+    E_P = np.atleast_2d(E_P)
+    N, J = E_P.shape
+    if J <= 4:
+        scaled_E = (E_P - E_P.mean(axis=1, keepdims=True)) / (epsilon + np.finfo(float).eps)
+        e = np.exp(scaled_E - scaled_E.max(axis=1, keepdims=True))
+        return e / e.sum(axis=1, keepdims=True)
+
+    # Add small diagonal noise to ensure positive definiteness
+    V_P_stable = np.reshape(V_P, (N, J, J)) + 1e-6 * np.eye(J)
+    return mvn_choice_probabilities(E_P, V_P_stable, n_draws=n_draws, seed=seed)
+
+
+def calculate_dft_dynamics(phi1, phi2, tau, epsilon, beta, M, initial_P=None, w=None):
+    """
+    Batched port of calculateDFTdynamics.m (without the P_tau sample path)
+    :param M: attribute values [N x J x K] or a single J x K trial
+    :return: E_P (N x J), V_P (N x J x J), choice_probs (N x J)
+    """
+    tau = max(1, round(tau))  # ensure tau is integer
+    E_P, V_P = preference_moments(phi1, phi2, tau, epsilon, beta, M, initial_P, w)
+    choice_probs = choice_probabilities(E_P, V_P, epsilon)
+    return E_P, V_P, choice_probs / choice_probs.sum(axis=1, keepdims=True)
+
+
+if __name__ == "__main__":
+    import pandas as pd
+
+    data = pd.read_csv("testTrial_Resource_Allocation_AllPairing.csv")
+    M = attribute_tensor(data)
+    E_P, V_P, probs = calculate_dft_dynamics(0.5, 0.8, 10, 0.1, np.ones(5) / 5, M)
+    for trial, p in zip(data["trial"], probs):
+        print(f"Trial {trial}: " + "  ".join(f"{x:.3f}" for x in p))
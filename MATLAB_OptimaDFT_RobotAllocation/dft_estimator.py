@@ -0,0 +1,465 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from scipy.optimize import minimize
+from scipy.special import ndtr
+
+from dft_dynamics import attribute_tensor, preference_moments
+
+# Same parameterization as the Apollo model in Figma/Version2/dft_service.py
+PARAM_NAMES = ["asc_1", "asc_2", "asc_3",
+               "b_energy", "b_pace", "b_safety", "b_reliability", "b_intelligence",
+               "phi1", "phi2", "error_sd", "timesteps"]
+APOLLO_BETA = {"asc_1": 0, "asc_2": 0, "asc_3": 0,
+               "b_energy": 1, "b_pace": 0, "b_safety": 1, "b_reliability": 0, "b_intelligence": 1,
+               "phi1": 1, "phi2": 0, "error_sd": 1, "timesteps": 1}
+APOLLO_FIXED = ["asc_3", "b_reliability"]
+
+_ASC = slice(0, 3)
+_B = slice(3, 8)
+_PHI1, _PHI2, _SD, _TS = 8, 9, 10, 11
+
+# Loss returned where the likelihood cannot be evaluated (non-finite parameters or
+# moments, e.g. a line-search step from a jittered start), so BFGS backtracks instead
+# of failing
+_INVALID_LOSS = 1e12
+
+# Gauss-Legendre nodes on [0, 1] for the bivariate normal integral
+_GL_X, _GL_W = np.polynomial.legendre.leggauss(20)
+_GL_X, _GL_W = (_GL_X + 1) / 2, _GL_W / 2
+
+
+def prepare_data(data):
+    """
+    Clip attributes to 0.01-1 as the Apollo model does and return (M, choice index)
+    :param data: DataFrame or list of per-trial dicts in the pairing-data schema, or
+                 the arrays returned by pairing_loader.load_pairing_data (already clipped)
+    """
+    if isinstance(data, dict) and "M" in data:
+        return np.asarray(data["M"], dtype=float), np.asarray(data["choice"], dtype=int) - 1
+    if not isinstance(data, pd.DataFrame):
+        data = pd.DataFrame(data)
+    M = np.clip(attribute_tensor(data), 0.01, 1)
+    choice = np.asarray(data["choice"], dtype=int) - 1
+    return M, choice
+
+
+def _pow_parts(x, tau):
+    """Re(x**tau) with its derivatives in x and tau"""
+    ax = np.abs(x)
+    logx = np.log(np.where(ax > 0, ax, 1.0))
+    mag = ax ** tau
+    neg = x < 0
+    cos, sin = np.cos(np.pi * tau), np.sin(np.pi * tau)
+    p = np.where(neg, mag * cos, mag)
+    mag1 = ax ** (tau - 1)
+    px = tau * np.where(neg, -mag1 * cos, mag1)
+    pt = np.where(neg, mag * (logx * cos - np.pi * sin), mag * logx)
+    return p, px, pt
+
+
+def _geo_parts(x, tau):
+    """g(x) = (1 - x**tau) / (1 - x) with its derivatives in x and tau, stable near x = 1"""
+    pos = x > 0
+    u = np.log(np.where(pos, x, 1.0))
+    small = np.abs(u) < 1e-7
+    em = np.where(small, 1.0, np.expm1(u))
+    et = np.expm1(tau * u)
+    g_pos = np.where(small, tau + 0.5 * tau * (tau - 1) * u, et / em)
+    dg_du = np.where(small, 0.5 * tau * (tau - 1), (tau * (et + 1) * em - et * (em + 1)) / em ** 2)
+    gx_pos = dg_du / np.where(pos, x, 1.0)
+    gt_pos = np.where(small, 1 + (tau - 0.5) * u, u * (et + 1) / em)
+
+    p, px, pt = _pow_parts(x, tau)
+    one_minus = np.where(pos, 1.0, 1 - x)
+    g_neg = (1 - p) / one_minus
+    g = np.where(pos, g_pos, g_neg)
+    gx = np.where(pos, gx_pos, (g_neg - px) / one_minus)
+    gt = np.where(pos, gt_pos, -pt / one_minus)
+    return g, gx, gt
+
+
+def _divided(fa, fb, da, db, a, b):
+    """First divided difference (f(a) - f(b)) / (a - b), using f' when a and b coincide"""
+    close = np.abs(a - b) < 1e-7 * (1 + np.abs(a))
+    return np.where(close, 0.5 * (da + db), (fa - fb) / np.where(close, 1.0, a - b))
+
+
+def transform(theta):
+    """Map raw Apollo parameters to the DFT quantities (and their derivatives)"""
+    b = theta[_B]
+    w = np.exp(b - b.max())
+    w = w / w.sum()
+    dw = np.diag(w) - np.outer(w, w)  # dw[:, k] = d w / d b_k
+    sigma = max(0.1, theta[_SD])
+    dsigma = 1.0 if theta[_SD] > 0.1 else 0.0
+    tau = 1 + np.exp(min(5, theta[_TS]))
+    dtau = np.exp(theta[_TS]) if theta[_TS] < 5 else 0.0
+    return {"P0": theta[_ASC], "w": w, "dw": dw, "phi1": theta[_PHI1], "phi2": theta[_PHI2],
+            "sigma": sigma, "dsigma": dsigma, "tau": tau, "dtau": dtau}
+
+
+def moments_with_gradient(theta, M):
+    """
+    E_P, V_P for every trial plus their derivatives with respect to all 12 raw parameters.
+
+    Works in the eigenbasis of S (see dft_dynamics.preference_moments). Changes of S
+    (phi1, phi2) are differentiated with first divided differences of the scalar functions
+    applied to the eigenvalues, which stays exact when eigenvalues coincide (e.g. phi2 = 0).
+    :return: E (N x J), V (N x J x J), dE (N x P x J), dV (N x P x J x J)
+    """
+    t = transform(np.asarray(theta, dtype=float))
+    N, J, K = M.shape
+    P = len(PARAM_NAMES)
+    w, tau = t["w"], t["tau"]
+
+    C = np.eye(J) - np.ones((J, J)) / J
+    CM = np.einsum("ij,njk->nik", C, M)
+    diff = M[:, :, None, :] - M[:, None, :, :]
+    D2 = np.einsum("nijk,nijk->nij", diff, diff)
+    kern = np.exp(-t["phi1"] * D2)
+    S = np.eye(J) - t["phi2"] * kern
+    mu = CM @ w
+    Psi = np.diag(w) - np.outer(w, w)
+    CMt = CM.transpose(0, 2, 1)
+    Phi = CM @ Psi @ CMt + t["sigma"] ** 2 * np.eye(J)
+
+    lam, Q = np.linalg.eigh(S)
+    Qt = Q.transpose(0, 2, 1)
+    nu = np.einsum("nji,nj->ni", Q, mu)
+    pi0 = np.einsum("nji,j->ni", Q, t["P0"][:J])  # J = 2 uses asc_1 and asc_2
+    Phit = Qt @ Phi @ Q
+
+    g, gx, gt = _geo_parts(lam, tau)
+    p, px, pt = _pow_parts(lam, tau)
+    L2 = lam[:, :, None] * lam[:, None, :]
+    H, Hx, Ht = _geo_parts(L2, tau)
+
+    E = np.einsum("nij,nj->ni", Q, g * nu + p * pi0)
+    V = Q @ (Phit * H) @ Qt
+
+    dEt = np.zeros((N, P, J))
+    dVt = np.zeros((N, P, J, J))
+
+    # Initial preferences (ASCs)
+    dEt[:, _ASC.start:_ASC.start + J] = p[:, None, :] * Q
+    # Attention weights enter mu and Phi
+    dmu = CM @ t["dw"]  # N x J x K
+    dEt[:, _B] = g[:, None, :] * np.einsum("nji,njk->nki", Q, dmu)
+    dPsi = (np.einsum("ik,ij->kij", t["dw"], np.eye(K))
+            - np.einsum("ik,j->kij", t["dw"], w) - np.einsum("i,jk->kij", w, t["dw"]))
+    QtCM = (Qt @ CM)[:, None]
+    dVt[:, _B] = (QtCM @ dPsi @ QtCM.transpose(0, 1, 3, 2)) * H[:, None]
+    # Feedback matrix S through phi1 and phi2
+    G1 = _divided(g[:, :, None], g[:, None, :], gx[:, :, None], gx[:, None, :],
+                  lam[:, :, None], lam[:, None, :])
+    P1 = _divided(p[:, :, None], p[:, None, :], px[:, :, None], px[:, None, :],
+                  lam[:, :, None], lam[:, None, :])
+    # X1[n,i,k,j]: between L2[i,j] and L2[k,j]; X2[n,i,j,l]: between L2[i,j] and L2[i,l]
+    X1 = _divided(H[:, :, None, :], H[:, None, :, :], Hx[:, :, None, :], Hx[:, None, :, :],
+                  L2[:, :, None, :], L2[:, None, :, :])
+    X2 = _divided(H[:, :, :, None], H[:, :, None, :], Hx[:, :, :, None], Hx[:, :, None, :],
+                  L2[:, :, :, None], L2[:, :, None, :])
+    for idx, dS in ((_PHI1, t["phi2"] * D2 * kern), (_PHI2, -kern)):
+        Et = Qt @ dS @ Q
+        dEt[:, idx] = np.einsum("nij,nj->ni", G1 * Et, nu) + np.einsum("nij,nj->ni", P1 * Et, pi0)
+        dVt[:, idx] = ((X1 * Et[:, :, :, None] * Phit[:, None]).sum(axis=2) * lam[:, None, :]
+                       + (X2 * Et[:, None] * Phit[:, :, None]).sum(axis=3) * lam[:, :, None])
+    # Noise and number of steps
+    dVt[:, _SD] = 2 * t["sigma"] * t["dsigma"] * np.eye(J) * H
+    dEt[:, _TS] = t["dtau"] * (gt * nu + pt * pi0)
+    dVt[:, _TS] = t["dtau"] * Phit * Ht
+
+    dE = np.einsum("nij,npj->npi", Q, dEt)
+    dV = Q[:, None] @ dVt @ Qt[:, None]
+    return E, V, dE, dV
+
+
+def bvn_cdf(h, k, rho):
+    """
+    Vectorized bivariate standard normal CDF P(X < h, Y < k) with its partial derivatives
+    :return: F, dF/dh, dF/dk, dF/drho
+    """
+    rho = np.clip(rho, -1 + 1e-10, 1 - 1e-10)
+    asr = np.arcsin(rho)
+    sn = np.sin(asr[..., None] * _GL_X)
+    integrand = np.exp((h[..., None] * k[..., None] * sn - 0.5 * (h[..., None] ** 2 + k[..., None] ** 2))
+                       / (1 - sn ** 2))
+    F = ndtr(h) * ndtr(k) + asr / (2 * np.pi) * (integrand @ _GL_W)
+    r = np.sqrt(1 - rho ** 2)
+    pdf = lambda x: np.exp(-0.5 * x ** 2) / np.sqrt(2 * np.pi)
+    dh = pdf(h) * ndtr((k - rho * h) / r)
+    dk = pdf(k) * ndtr((h - rho * k) / r)
+    drho = np.exp(-(h ** 2 - 2 * rho * h * k + k ** 2) / (2 * r ** 2)) / (2 * np.pi * r)
+    return np.clip(F, 0, 1), dh, dk, drho
+
+
+def log_likelihood(theta, M, choice):
+    """
+    Log-likelihood of the observed choices and its gradient in the raw parameters.
+
+    P(choice) = P(P_c > P_j for all j != c) with P ~ N(E_P, V_P), evaluated exactly on the
+    differences to the chosen alternative (univariate for J = 2, bivariate for J = 3).
+    """
+    E, V, dE, dV = moments_with_gradient(theta, M)
+    N, J = E.shape
+    if J not in (2, 3):
+        raise ValueError(f"Exact choice probabilities need 2 or 3 alternatives, got {J}")
+    L = np.zeros((N, J - 1, J))
+    rows = np.arange(N)
+    L[rows, :, choice] = 1
+    others = np.array([[j for j in range(J) if j != c] for c in range(J)])[choice]
+    for d in range(J - 1):
+        L[rows, d, others[:, d]] = -1
+
+    m = np.einsum("ndj,nj->nd", L, E)
+    dm = np.einsum("ndj,npj->npd", L, dE)
+    Sig = L @ V @ L.transpose(0, 2, 1)
+    dSig = L[:, None] @ dV @ L.transpose(0, 2, 1)[:, None]
+    var = np.diagonal(Sig, axis1=1, axis2=2)
+    dvar = np.diagonal(dSig, axis1=2, axis2=3)
+    s = np.sqrt(var)
+    z = m / s
+    dz = dm / s[:, None] - 0.5 * z[:, None] * dvar / var[:, None]
+
+    if J == 2:
+        prob = ndtr(z[:, 0])
+        dprob = np.exp(-0.5 * z[:, :1] ** 2) / np.sqrt(2 * np.pi) * dz[:, :, 0]
+    else:
+        cov = 0.5 * (Sig[:, 0, 1] + Sig[:, 1, 0])
+        dcov = 0.5 * (dSig[:, :, 0, 1] + dSig[:, :, 1, 0])
+        rho = cov / (s[:, 0] * s[:, 1])
+        drho = (dcov / (s[:, 0] * s[:, 1])[:, None]
+                - 0.5 * rho[:, None] * (dvar[:, :, 0] / var[:, None, 0] + dvar[:, :, 1] / var[:, None, 1]))
+        prob, Fh, Fk, Fr = bvn_cdf(z[:, 0], z[:, 1], rho)
+        dprob = Fh[:, None] * dz[:, :, 0] + Fk[:, None] * dz[:, :, 1] + Fr[:, None] * drho
+
+    prob = np.maximum(prob, 1e-300)
+    return np.log(prob).sum(), (dprob / prob[:, None]).sum(axis=0)
+
+
+def predict_choices(theta, M):
+    """
+    Probability of every alternative under the model log_likelihood fits, without gradients
+    :param M: clipped attribute values (N x J x 5), J = 2 or 3
+    :return: probabilities (N x J), E_P (N x J)
+    """
+    t = transform(np.asarray(theta, dtype=float))
+    N, J, _ = M.shape
+    if J not in (2, 3):
+        raise ValueError(f"Exact choice probabilities need 2 or 3 alternatives, got {J}")
+    E, V = preference_moments(t["phi1"], t["phi2"], t["tau"], t["sigma"], 1.0, M, t["P0"][:J], t["w"])
+
+    # L[c] maps P to the differences P_c - P_j of alternative c to the others
+    L = np.zeros((J, J - 1, J))
+    for c in range(J):
+        L[c, :, c] = 1
+        L[c, np.arange(J - 1), [j for j in range(J) if j != c]] = -1
+    m = np.einsum("cdj,nj->ncd", L, E)
+    Sig = np.einsum("cdj,njk,cek->ncde", L, V, L)
+    s = np.sqrt(np.diagonal(Sig, axis1=2, axis2=3))
+    z = m / s
+    if J == 2:
+        prob = ndtr(z[..., 0])
+    else:
+        prob = bvn_cdf(z[..., 0], z[..., 1], Sig[..., 0, 1] / (s[..., 0] * s[..., 1]))[0]
+    return prob / prob.sum(axis=1, keepdims=True), E
+
+
+def simulate_choices(theta, M, seed=0):
+    """
+    Draw one choice per trial from the model log_likelihood describes (the alternative
+    with the largest P_tau ~ N(E_P, V_P)); 1-based like the choice column
+    """
+    t = transform(np.asarray(theta, dtype=float))
+    E, V = preference_moments(t["phi1"], t["phi2"], t["tau"], t["sigma"], 1.0, M, t["P0"], t["w"])
+    rng = np.random.default_rng(seed)
+    z = rng.standard_normal(E.shape)
+    P = E + np.einsum("nij,nj->ni", np.linalg.cholesky(V + 1e-12 * np.eye(E.shape[1])), z)
+    return P.argmax(axis=1) + 1
+
+
+def plateau_rule(rel_tol=5e-6, grad_tol=1e-3, step_tol=1e-3, window=5, min_iterations=3):
+    """
+    Early-stopping rule over iteration records (dicts with logLike and the parameters,
+    as in Apollo's iterations file or estimate's callback records): stop once the
+    logLike moved by at most rel_tol * |logLike| over the last `window` iterations and
+    the gradient norm stayed below grad_tol. Records without a gradient_norm (Apollo's
+    file) use the largest parameter step in the window against step_tol instead.
+    :return: should_stop(records) -> bool
+    """
+    def should_stop(records):
+        if len(records) <= max(window, min_iterations):
+            return False
+        recent = records[-window - 1:]
+        ll = np.array([r["logLike"] for r in recent])
+        if np.ptp(ll) > rel_tol * max(1.0, abs(ll[-1])):
+            return False
+        if all("gradient_norm" in r for r in recent):
+            return max(r["gradient_norm"] for r in recent[1:]) <= grad_tol
+        params = np.array([[r[name] for name in PARAM_NAMES if name in r] for r in recent])
+        return np.abs(np.diff(params, axis=0)).max() <= step_tol
+    return should_stop
+
+
+class _StopFit(Exception):
+    """Carries the iterate at which an iteration callback stopped the fit"""
+
+
+def _fit_one(args, callback=None, start=0):
+    """
+    Run BFGS from one starting point (module level so it can run in a process pool).
+    callback(record) is called after every iteration and may raise StopIteration.
+    :return: x, logLike, iterations, converged, stopped early
+    """
+    x0, theta0, free, M, choice, maxiter, gtol = args
+    theta = theta0.copy()
+    last = {}
+
+    def objective(x):
+        theta[free] = x
+        if not np.all(np.isfinite(x)):
+            return _INVALID_LOSS, np.zeros(len(free))
+        try:
+            with np.errstate(all="ignore"):
+                ll, grad = log_likelihood(theta, M, choice)
+        except np.linalg.LinAlgError:
+            return _INVALID_LOSS, np.zeros(len(free))
+        if not np.isfinite(ll) or not np.all(np.isfinite(grad[free])):
+            return _INVALID_LOSS, np.zeros(len(free))
+        last.update(x=x.copy(), ll=ll, grad_norm=float(np.linalg.norm(grad[free])))
+        return -ll, -grad[free]
+
+    def on_iteration(xk):
+        if not np.array_equal(last.get("x"), xk):
+            objective(xk)  # BFGS normally ends each iteration by evaluating at xk
+        last["nit"] = last.get("nit", 0) + 1
+        record = dict(zip(PARAM_NAMES, theta.tolist()))
+        record.update(logLike=last["ll"], gradient_norm=last["grad_norm"], iteration=last["nit"], start=start)
+        try:
+            callback(record)
+        except StopIteration:
+            raise _StopFit(xk.copy())
+
+    try:
+        res = minimize(objective, x0, jac=True, method="BFGS", options={"maxiter": maxiter, "gtol": gtol},
+                       callback=None if callback is None else on_iteration)
+    except _StopFit as stop:
+        return stop.args[0], last["ll"], last["nit"], False, True
+    if not res.fun < _INVALID_LOSS:
+        raise FloatingPointError("The logLike is not finite at this starting point")
+    return res.x, -res.fun, res.nit, bool(res.success), False
+
+
+def _standard_errors(theta, free, M, choice, step=1e-5, rcond=1e-9):
+    """
+    Standard errors from the Hessian of the analytic gradient (central differences).
+
+    Directions where the logLike is flat are left out of the inversion, so the other
+    standard errors stay finite: timesteps at its cap of 5 or error_sd at its floor of
+    0.1 (where the model clamps them), then, one at a time, the parameter loading most
+    on a Hessian eigenvalue below rcond times the largest (weakly identified, e.g. b_*
+    drifting off together). The remaining standard errors are conditional on those.
+    :return: (se for the free parameters, {name: why its se is NaN})
+    """
+    reasons = {}
+    if theta[_TS] >= 5 - step:
+        reasons["timesteps"] = "timesteps is at its cap of 5, where the logLike does not depend on it"
+    if theta[_SD] <= 0.1 + step:
+        reasons["error_sd"] = "error_sd is at its floor of 0.1, where the logLike does not depend on it"
+
+    n = len(free)
+    hess = np.zeros((n, n))
+    for i, idx in enumerate(free):
+        up, down = theta.copy(), theta.copy()
+        up[idx] += step
+        down[idx] -= step
+        hess[i] = (log_likelihood(up, M, choice)[1][free] - log_likelihood(down, M, choice)[1][free]) / (2 * step)
+    info = -0.5 * (hess + hess.T)
+
+    keep = [i for i, idx in enumerate(free) if PARAM_NAMES[idx] not in reasons]
+    se = np.full(n, np.nan)
+    while keep:
+        sub = info[np.ix_(keep, keep)]
+        if not np.all(np.isfinite(sub)):
+            for i in keep:
+                reasons[PARAM_NAMES[free[i]]] = "the logLike Hessian is not finite at the estimate"
+            break
+        eigval, eigvec = np.linalg.eigh(sub)
+        if eigval[0] > rcond * max(np.abs(eigval).max(), 1.0):
+            se[keep] = np.sqrt(np.diag(np.linalg.inv(sub)))
+            break
+        weakest = keep.pop(int(np.abs(eigvec[:, 0]).argmax()))
+        reasons[PARAM_NAMES[free[weakest]]] = "weakly identified: the logLike is flat (or not at a maximum) along it"
+    return se, reasons
+
+
+def estimate(data, apollo_beta=None, apollo_fixed=None, n_starts=1, n_jobs=None,
+             start_sd=0.5, seed=0, maxiter=500, gtol=1e-5, callback=None):
+    """
+    Maximum-likelihood DFT estimation in-process (replaces the Rscript/Apollo round trip)
+    :param data: DataFrame, list of per-trial dicts or load_pairing_data arrays
+    :param apollo_beta: starting values (defaults to the ones in dft_service.py)
+    :param apollo_fixed: names of parameters kept at their starting value
+    :param n_starts: number of BFGS starts; extra starts are jittered by start_sd
+    :param n_jobs: process pool size for multi-start (None = all cores, 1 = in-process)
+    :param callback: callback(record) after every BFGS iteration, with the parameters,
+                     logLike, gradient_norm, iteration and start index; raising
+                     StopIteration ends that start at the current iterate. Starts then
+                     run in-process.
+    :return: dict with estimate, se, seNotes (why a free parameter's se is NaN),
+             logLike, iterations, converged, stoppedEarly, failedStarts and nObs. Starts that fail are dropped; the first error is
+             raised only if every start fails.
+    """
+    apollo_beta = {**APOLLO_BETA, **(apollo_beta or {})}
+    apollo_fixed = APOLLO_FIXED if apollo_fixed is None else list(apollo_fixed)
+    M, choice = prepare_data(data)
+    theta0 = np.array([apollo_beta[name] for name in PARAM_NAMES], dtype=float)
+    free = np.array([i for i, name in enumerate(PARAM_NAMES) if name not in apollo_fixed])
+
+    rng = np.random.default_rng(seed)
+    starts = [theta0[free]] + [theta0[free] + rng.normal(0, start_sd, len(free))
+                               for _ in range(n_starts - 1)]
+    jobs = [(x0, theta0, free, M, choice, maxiter, gtol) for x0 in starts]
+    fits, errors = [], []
+    if n_starts > 1 and n_jobs != 1 and callback is None:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            for future in [pool.submit(_fit_one, job) for job in jobs]:
+                try:
+                    fits.append(future.result())
+                except (ArithmeticError, ValueError) as e:  # LinAlgError is a ValueError
+                    errors.append(e)
+    else:
+        for start, job in enumerate(jobs):
+            try:
+                fits.append(_fit_one(job, callback, start))
+            except (ArithmeticError, ValueError) as e:
+                errors.append(e)
+    if not fits:
+        raise errors[0]
+
+    x, ll, nit, success, stopped = max(fits, key=lambda fit: fit[1])
+    theta = theta0.copy()
+    theta[free] = x
+    se = np.full(len(PARAM_NAMES), np.nan)
+    se[free], se_notes = _standard_errors(theta, free, M, choice)
+    return {
+        "estimate": dict(zip(PARAM_NAMES, theta.tolist())),
+        "se": dict(zip(PARAM_NAMES, se.tolist())),
+        "seNotes": se_notes,
+        "logLike": ll,
+        "iterations": nit,
+        "converged": success,
+        "stoppedEarly": stopped,
+        "failedStarts": len(errors),
+        "nObs": len(choice),
+    }
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else "testTrial_Resource_Allocation_AllPairing.csv"
+    model = estimate(pd.read_csv(csv_path))
+    print(json.dumps(model, indent=2))
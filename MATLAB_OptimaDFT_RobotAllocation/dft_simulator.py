@@ -0,0 +1,102 @@
+import numpy as np
+
+from dft_dynamics import dft_matrices
+
+
+def simulate_trajectories(phi1, phi2, tau, epsilon, beta, M, initial_P=None, w=None,
+                          n_replicates=100, chunk_steps=None, max_elements=4_000_000, seed=0):
+    """
+    Stream P_tau sample paths for R replicates of every trial (step 9 of calculateDFTdynamics).
+
+    Attention samples and noise are drawn a block of steps at a time, and each block of
+    states is yielded before the next one is simulated, so memory does not grow with tau.
+    :param M: attribute values [N x J x K] or a single J x K trial
+    :param chunk_steps: steps per yielded block (default: as many as fit in max_elements)
+    :return: generator of (steps, states) with steps (T_chunk,) and states (T_chunk x N x R x J);
+             the first block starts with step 0 (initial_P)
+    """
+    tau = max(1, round(tau))  # ensure tau is integer
+    S, _, _ = dft_matrices(phi1, phi2, epsilon, beta, M, w)
+    M = np.asarray(M, dtype=float)
+    if M.ndim == 2:
+        M = M[None]
+    N, J, K = M.shape
+    R = n_replicates
+    if w is None:
+        w = np.ones(K) / K
+    else:
+        w = np.asarray(w, dtype=float).ravel()
+        w = w / w.sum()
+
+    # Valence of attending to attribute k alone: C * M_scaled * e_k
+    C = np.eye(J) - np.ones((J, J)) / J
+    CM = np.einsum("ij,njk->nik", C, M * np.broadcast_to(np.asarray(beta, dtype=float).ravel(), (K,)))
+    CM_by_attr = CM.transpose(0, 2, 1)  # N x K x J
+
+    if chunk_steps is None:
+        chunk_steps = max(1, max_elements // (N * R * J))
+    rng = np.random.default_rng(seed)
+
+    P = np.broadcast_to(np.zeros(J) if initial_P is None else np.asarray(initial_P, dtype=float),
+                        (N, R, J)).copy()
+    yield np.array([0]), P[None].copy()
+
+    step = 0
+    while step < tau:
+        T = min(chunk_steps, tau - step)
+        # Random attention (one attribute per step) and noise for the whole block
+        att = rng.choice(K, size=(T, N, R), p=w)
+        noise = epsilon * rng.standard_normal((T, N, R, J))
+        block = np.empty((T, N, R, J))
+        rows = np.arange(N)[:, None]
+        for t in range(T):
+            V = CM_by_attr[rows, att[t]] + noise[t]
+            P = np.einsum("nij,nrj->nri", S, P) + V
+            block[t] = P
+        yield np.arange(step + 1, step + T + 1), block
+        step += T
+
+
+def summarize_trajectories(phi1, phi2, tau, epsilon, beta, M, initial_P=None, w=None,
+                           n_replicates=100, quantiles=(0.05, 0.5, 0.95), threshold=None, **kwargs):
+    """
+    Per-step summaries of simulate_trajectories without keeping the sample paths.
+    :param threshold: preference level for first-passage times (optional)
+    :return: dict with mean and quantiles over replicates for every step
+             ((T+1) x N x J and Q x (T+1) x N x J); with a threshold also the first
+             passage step and alternative per replicate (N x R, -1 if never reached)
+    """
+    means, quants = [], []
+    fpt = first_alt = None
+    for steps, block in simulate_trajectories(phi1, phi2, tau, epsilon, beta, M, initial_P, w,
+                                              n_replicates, **kwargs):
+        means.append(block.mean(axis=2))
+        quants.append(np.quantile(block, quantiles, axis=2))
+        if threshold is not None:
+            if fpt is None:
+                fpt = np.full(block.shape[1:3], -1)
+                first_alt = np.full(block.shape[1:3], -1)
+            crossed = block.max(axis=3) >= threshold  # T x N x R
+            hit = crossed.any(axis=0) & (fpt < 0)
+            first = crossed.argmax(axis=0)
+            fpt[hit] = steps[first[hit]]
+            t_idx, (n_idx, r_idx) = first[hit], np.nonzero(hit)
+            first_alt[hit] = block[t_idx, n_idx, r_idx].argmax(axis=1)
+
+    summary = {"mean": np.concatenate(means), "quantiles": np.concatenate(quants, axis=1),
+               "quantile_levels": np.asarray(quantiles)}
+    if threshold is not None:
+        summary["first_passage_step"] = fpt
+        summary["first_passage_choice"] = first_alt
+    return summary
+
+
+if __name__ == "__main__":
+    import pandas as pd
+    from dft_dynamics import attribute_tensor
+
+    data = pd.read_csv("testTrial_Resource_Allocation_AllPairing.csv")
+    summary = summarize_trajectories(0.5, 0.8, 10, 0.1, np.ones(5) / 5, attribute_tensor(data),
+                                     n_replicates=1000, threshold=0.5)
+    for n, trial in enumerate(data["trial"]):
+        print(f"Trial {trial}: final mean " + "  ".join(f"{x:.3f}" for x in summary["mean"][-1, n]))
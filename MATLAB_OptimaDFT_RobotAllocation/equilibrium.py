@@ -0,0 +1,183 @@
+from functools import lru_cache
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import splu
+from scipy.stats import norm
+
+NX, NY = 10, 5  # robot states (5 robots x 2 component types), human responses
+
+# Structural matrices and cost gradients from solve_equilibrium.m
+BAR_A = np.diag([1., 2., 1., 2., 1., 1., 2., 1., 2., -1.])
+BAR_B = np.eye(NY)
+F_X = np.array([2., 2., -3., -3., 5., 5., 4., 4., 1., 1.])  # F_x(x) = F_X * x
+G_R = np.array([3., 3., 4., 4., 4.])  # G_r(y) = G_R * y
+B_AGG = np.array([1., 1., 2., 1., 1.])  # aggregation row for the uncertainty offset
+
+# Communication graph of the 7 agents (5 robots, 2 humans) from optimize_method.m
+AGENT_LAPLACIAN = np.array([[3, -1, -1, -1, 0, 0, 0],
+                            [-1, 4, -1, 0, -1, -1, 0],
+                            [-1, -1, 5, -1, -1, 0, -1],
+                            [-1, 0, -1, 3, 0, 0, -1],
+                            [0, -1, -1, 0, 4, -1, -1],
+                            [0, -1, 0, 0, -1, 2, 0],
+                            [0, 0, -1, -1, -1, 0, 3]], dtype=float)
+# Agent owning each constraint row: robot i -> its two x entries, human 1 -> P1 (y1:2), human 2 -> P2 (y3:5)
+ROW_OWNERS = np.array([0, 0, 1, 1, 2, 2, 3, 3, 4, 4, 5, 5, 6, 6, 6])
+
+
+def robot_production_capacity(M):
+    """
+    Port of robot_production_capacity.m for any number of robots, batched over
+    leading dimensions
+    :param M: robot attributes [... x N robots x 5 attributes]
+    :return: x_mins [... x 2N] = [Robot1_A, Robot1_B, ..., RobotN_B] (integers 1-10)
+    """
+    M = np.asarray(M, dtype=float)
+    if M.ndim < 2 or M.shape[-1] != 5:
+        raise ValueError("Input must be an N x 5 matrix (N robots x 5 attributes).")
+    weights = np.array([[0.4, 0.3, 0.1, 0.1, 0.1],   # Type A: weight energy higher
+                        [0.2, 0.2, 0.2, 0.2, 0.2]])  # Type B: balanced
+    raw = M @ weights.T  # ... x N x 2
+    # Scale to 1-10 and round half away from zero like MATLAB's round
+    x_mins = np.clip(np.floor(raw * 9 + 0.5) + 1, 1, 10)
+    return x_mins.reshape(M.shape[:-2] + (2 * M.shape[-2],)).astype(int)
+
+
+def constraint_laplacian(agent_laplacian=AGENT_LAPLACIAN, owners=ROW_OWNERS):
+    """
+    barL for the NX + NY constraint rows (not defined in solve_equilibrium.m): two rows
+    are coupled when their owning agents are the same or neighbours in the agent graph
+    """
+    W = (np.asarray(agent_laplacian)[np.ix_(owners, owners)] != 0).astype(float)
+    np.fill_diagonal(W, 0)
+    return np.diag(W.sum(axis=1)) - W
+
+
+def response_jacobian():
+    """dy/dx of h(x) = [Ep(1:2) + x(1:2); Ep(3:5) + x(3:5) - [x(6:7); 0]]"""
+    H = np.zeros((NY, NX))
+    H[:, :NY] = np.eye(NY)
+    H[2, 5] = H[3, 6] = -1
+    return H
+
+
+class EquilibriumSolver:
+    """
+    Linear KKT system of solve_equilibrium.m, assembled and LU-factored once.
+
+    Unknowns are [x; x_plus; alpha; beta; lambda; mu]. All gradients and constraints
+    are linear, so only the right-hand side depends on E_P (through h) and V_P
+    (through the offset D_tau). barL is singular along the all-ones vector, so
+    alpha(1) = beta(1) = 0 is fixed and the matching redundant rows of
+    barL' lambda = 0 and barL' mu = 0 are dropped.
+    :param laplacian: barL [(NX+NY) x (NX+NY)], constraint_laplacian() by default
+    """
+
+    def __init__(self, laplacian=None):
+        L = constraint_laplacian() if laplacian is None else np.asarray(laplacian, dtype=float)
+        n = NX + NY
+        H = response_jacobian()
+        BH = BAR_B @ H
+        A_top = np.vstack([BAR_A, np.zeros((NY, NX))])
+        A_bot = np.vstack([np.zeros((NX, NX)), BH])
+        self.H = H
+        self.offsets = np.cumsum([0, NX, NX, n, n, n, n])
+        o = self.offsets
+
+        K = np.zeros((o[-1], o[-1]))
+        # eq1: F_x(x) + dy_dx' G_r(y) + block_top lambda + block_bot mu = 0
+        K[o[0]:o[1], o[0]:o[1]] = np.diag(F_X) + H.T @ np.diag(G_R) @ H
+        K[o[0]:o[1], o[4]:o[5]] = A_top.T
+        K[o[0]:o[1], o[5]:o[6]] = A_bot.T
+        # eq2: F_x(x_plus) + [barA; 0]' mu = 0
+        K[o[1]:o[2], o[1]:o[2]] = np.diag(F_X)
+        K[o[1]:o[2], o[5]:o[6]] = A_top.T
+        # eq3, eq4: barL' lambda = 0, barL' mu = 0
+        K[o[2]:o[3], o[4]:o[5]] = L.T
+        K[o[3]:o[4], o[5]:o[6]] = L.T
+        # eq5: [barA x; barB y(x)] + barL alpha + D_tau = 0
+        K[o[4]:o[5], o[0]:o[1]] = np.vstack([BAR_A, BH])
+        K[o[4]:o[5], o[2]:o[3]] = L
+        # eq6: [barA x_plus; barB y(x)] + barL beta + D_tau1 = 0
+        K[o[5]:o[6], o[1]:o[2]] = A_top
+        K[o[5]:o[6], o[0]:o[1]] = A_bot
+        K[o[5]:o[6], o[3]:o[4]] = L
+
+        self.keep = np.setdiff1d(np.arange(o[-1]), [o[2], o[3]])
+        K = K[np.ix_(self.keep, self.keep)]
+        if np.linalg.matrix_rank(K) < len(self.keep):
+            raise ValueError("KKT system is singular for this Laplacian (is the graph connected?)")
+        self.lu = splu(sparse.csc_matrix(K))
+
+    def rhs(self, E_P, V_P):
+        """Right-hand sides for a batch: E_P (T x 5), V_P (T x 5 x 5) -> (NKEEP x T)"""
+        E_P = np.atleast_2d(np.asarray(E_P, dtype=float))
+        V_P = np.asarray(V_P, dtype=float).reshape(-1, NY, NY)
+        o = self.offsets
+        T = E_P.shape[0]
+
+        # Human preference uncertainty
+        D_const = np.sqrt(np.einsum("i,tij,j->t", B_AGG, V_P, B_AGG)) * norm.ppf(0.95) - 200
+        b = np.zeros((o[-1], T))
+        b[o[0]:o[1]] = -(self.H.T @ (G_R[:, None] * E_P.T))
+        b[o[4]] = b[o[5]] = -D_const
+        b[o[4] + NX:o[5]] = b[o[5] + NX:o[6]] = -(BAR_B @ E_P.T)
+        return b[self.keep]
+
+    def solve(self, E_P, V_P):
+        """
+        Equilibria for a batch of trials (or tau steps) with one triangular solve each
+        :return: dict of x, x_plus, alpha, beta, lambda, mu (each T x dim)
+        """
+        z = np.zeros((self.offsets[-1], np.atleast_2d(E_P).shape[0]))
+        z[self.keep] = self.lu.solve(self.rhs(E_P, V_P))
+        o = self.offsets
+        names = ["x", "x_plus", "alpha", "beta", "lambda", "mu"]
+        return {name: z[o[i]:o[i + 1]].T for i, name in enumerate(names)}
+
+
+@lru_cache(maxsize=1)
+def default_solver():
+    return EquilibriumSolver()
+
+
+def solve_equilibrium(Ep_mins, Varp_mins, x_mins=None):
+    """
+    Numeric replacement for solve_equilibrium.m, batched over trials
+    :param Ep_mins: expected preferences [5] or [T x 5]
+    :param Varp_mins: preference covariance [5 x 5] or [T x 5 x 5]
+    :param x_mins: robot_production_capacity output; accepted for parity with the
+                   MATLAB signature, which does not use it either
+    :return: dict with P_final (T x 10), E_P_eq (T x 5) and V_P_eq (T x 5 x 5), as
+             in the MATLAB struct, plus the full solution under "kkt"
+    """
+    Ep_mins = np.atleast_2d(np.asarray(Ep_mins, dtype=float))
+    if Ep_mins.shape[1] != NY:
+        raise ValueError("Ep_mins must be 5x1")
+    if np.shape(Varp_mins)[-2:] != (NY, NY):
+        raise ValueError("Varp_mins must be 5x5")
+    sol = default_solver().solve(Ep_mins, Varp_mins)
+    return {
+        "P_final": sol["x"],
+        "E_P_eq": sol["lambda"][:, :NY],
+        "V_P_eq": np.einsum("ti,ij->tij", sol["mu"][:, :NY], np.eye(NY)),
+        "kkt": sol,
+    }
+
+
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(0)
+    T = 10000
+    E_P = rng.normal(size=(T, NY))
+    R = rng.normal(size=(T, NY, NY))
+    V_P = R @ R.transpose(0, 2, 1) / NY + 0.1 * np.eye(NY)
+    default_solver()
+    start = time.perf_counter()
+    solutions = solve_equilibrium(E_P, V_P)
+    elapsed = time.perf_counter() - start
+    print(f"{T} equilibria in {elapsed:.3f} s ({1e6 * elapsed / T:.1f} us each)")
+    print("P_final (trial 1):", np.round(solutions["P_final"][0], 3))
+    print("x_mins:", robot_production_capacity(rng.uniform(0.3, 0.9, (5, 5))))
@@ -0,0 +1,214 @@
+import time
+from multiprocessing import Barrier, Process, shared_memory
+
+import numpy as np
+from scipy import sparse
+
+from equilibrium import robot_production_capacity
+
+N_TYPES = 2  # component types A and B
+
+
+def fleet_laplacian(n_robots, neighbours=2, shortcuts=1, seed=0):
+    """
+    Sparse communication Laplacian for a fleet: a ring lattice (each robot talks to
+    `neighbours` robots on either side) plus `shortcuts` random links per robot
+    """
+    rows, cols = [], []
+    idx = np.arange(n_robots)
+    for k in range(1, neighbours + 1):
+        rows.append(idx)
+        cols.append((idx + k) % n_robots)
+    rng = np.random.default_rng(seed)
+    for _ in range(shortcuts):
+        rows.append(idx)
+        cols.append(rng.integers(0, n_robots, n_robots))
+    rows, cols = np.concatenate(rows), np.concatenate(cols)
+    keep = rows != cols
+    W = sparse.coo_matrix((np.ones(keep.sum()), (rows[keep], cols[keep])), shape=(n_robots, n_robots))
+    W = ((W + W.T) > 0).astype(float)
+    return (sparse.diags(np.asarray(W.sum(axis=1)).ravel()) - W).tocsr()
+
+
+def centralized_solution(f, x_min, d):
+    """
+    Fixed point of the dynamics for checking: minimise sum_i 1/2 f_i (x_i - x_min_i)^2
+    subject to sum_i (x_i + d_i) = 0 per component type
+    """
+    nu = ((x_min + d).sum(axis=0)) / (1 / f).sum(axis=0)
+    return x_min - nu / f, nu
+
+
+class _Shared:
+    """Named shared-memory arrays, created by the coordinator and attached by workers"""
+
+    def __init__(self, specs, names=None):
+        self.blocks, self.arrays = {}, {}
+        for key, shape in specs.items():
+            size = int(np.prod(shape)) * 8
+            if names is None:
+                shm = shared_memory.SharedMemory(create=True, size=size)
+            else:
+                shm = shared_memory.SharedMemory(name=names[key])
+            self.blocks[key] = shm
+            self.arrays[key] = np.ndarray(shape, dtype=float, buffer=shm.buf)
+
+    def names(self):
+        return {key: shm.name for key, shm in self.blocks.items()}
+
+    def close(self, unlink=False):
+        self.arrays.clear()
+        for shm in self.blocks.values():
+            shm.close()
+            if unlink:
+                shm.unlink()
+
+
+def _specs(n_robots, n_workers):
+    return {
+        "x": (n_robots, N_TYPES),
+        "lam": (2, n_robots, N_TYPES),     # double-buffered: read slot k % 2, write the other
+        "alpha": (2, n_robots, N_TYPES),
+        "residual": (2, n_workers, N_TYPES + 2),
+        "status": (2,),                     # iterations done, converged flag
+    }
+
+
+def _worker(rank, names, specs, lo, hi, L_rows, f, x_min, a, d, dt, tol, max_iter, check_every, started, barrier):
+    """
+    Euler steps of the primal-dual dynamics for robots lo:hi
+        x'     = -(f (x - x_min) + a lambda)
+        lambda' = a x + d + L alpha - L lambda
+        alpha'  = -L lambda
+    Only the lambda and alpha entries of graph neighbours are read (rows lo:hi of L).
+    """
+    shared = _Shared(specs, names)
+    x, lam, alpha = shared.arrays["x"], shared.arrays["lam"], shared.arrays["alpha"]
+    residual, status = shared.arrays["residual"], shared.arrays["status"]
+    started.wait()
+
+    k = 0
+    while k < max_iter:
+        src, dst = k % 2, 1 - k % 2
+        L_lam = L_rows @ lam[src]
+        L_alpha = L_rows @ alpha[src]
+        x_local, lam_local = x[lo:hi], lam[src, lo:hi]
+
+        x_dot = -(f * (x_local - x_min) + a * lam_local)
+        lam[dst, lo:hi] = lam_local + dt * (a * x_local + d + L_alpha - L_lam)
+        alpha[dst, lo:hi] = alpha[src, lo:hi] - dt * L_lam
+        x[lo:hi] = x_local + dt * x_dot
+
+        check = (k + 1) % check_every == 0
+        if check:
+            res = residual[src, rank]
+            res[:N_TYPES] = (a * x_local + d).sum(axis=0)  # local share of the coupling constraint
+            res[N_TYPES] = np.abs(L_lam).max()              # multiplier disagreement
+            res[N_TYPES + 1] = np.abs(x_dot).max()          # stationarity
+        barrier.wait()
+        k += 1
+        if check:
+            # Every worker evaluates the same data, so all stop at the same iteration
+            res = residual[src]
+            feasibility = np.abs(res[:, :N_TYPES].sum(axis=0)).max()
+            if max(feasibility, res[:, N_TYPES:].max()) < tol:
+                if rank == 0:
+                    status[1] = 1
+                break
+    if rank == 0:
+        status[0] = k
+    shared.close()
+
+
+def simulate_fleet(M=None, x_min=None, laplacian=None, demand=None, f=1.0, a=1.0, n_workers=4,
+                   dt=None, tol=1e-6, max_iter=200_000, check_every=10):
+    """
+    Run the continuous-time primal-dual allocation dynamics of the robot fleet
+    (the process described in the solve_equilibrium.m header) across processes.
+
+    Robots are split into contiguous shards, one process each; states live in shared
+    memory and each process only reads its neighbours' multipliers per step.
+    :param M: robot attributes [N x 5]; x_min = robot_production_capacity(M) if x_min is not given
+    :param x_min: preferred production [N x 2]
+    :param laplacian: communication Laplacian (sparse), fleet_laplacian(N) by default
+    :param demand: total production required per type, default 90% of total capacity
+    :param f, a: cost curvature and production coefficient per robot (scalar or N x 2)
+    :return: dict with x, lambda, iterations, converged, wall time and per-iteration cost
+    """
+    if x_min is None:
+        x_min = robot_production_capacity(M).reshape(-1, N_TYPES)
+    x_min = np.asarray(x_min, dtype=float).reshape(-1, N_TYPES)
+    n_robots = x_min.shape[0]
+    L = fleet_laplacian(n_robots) if laplacian is None else sparse.csr_matrix(laplacian)
+    f = np.broadcast_to(np.asarray(f, dtype=float), x_min.shape)
+    a = np.broadcast_to(np.asarray(a, dtype=float), x_min.shape)
+    if demand is None:
+        demand = 0.9 * x_min.sum(axis=0)
+    d = np.broadcast_to(-np.asarray(demand, dtype=float) / n_robots, x_min.shape)
+    if dt is None:
+        # Explicit Euler is stable well inside 1 / (spectral radius of the linear dynamics)
+        dt = 0.5 / (f.max() + a.max() + 2 * L.diagonal().max())
+
+    n_workers = max(1, min(n_workers, n_robots))
+    bounds = np.linspace(0, n_robots, n_workers + 1).astype(int)
+    specs = _specs(n_robots, n_workers)
+    shared = _Shared(specs)
+    for array in shared.arrays.values():
+        array[:] = 0
+    shared.arrays["x"][:] = x_min
+
+    started = Barrier(n_workers + 1)  # workers attached, coordinator starts the clock
+    barrier = Barrier(n_workers)      # end of every step
+    workers = []
+    for rank in range(n_workers):
+        lo, hi = bounds[rank], bounds[rank + 1]
+        args = (rank, shared.names(), specs, lo, hi, L[lo:hi], f[lo:hi], x_min[lo:hi], a[lo:hi],
+                d[lo:hi], dt, tol, max_iter, check_every, started, barrier)
+        workers.append(Process(target=_worker, args=args, daemon=True))
+    try:
+        for w in workers:
+            w.start()
+        started.wait()
+        start = time.perf_counter()
+        for w in workers:
+            w.join()
+        wall = time.perf_counter() - start
+        if any(w.exitcode != 0 for w in workers):
+            raise RuntimeError("Fleet worker failed")
+
+        iterations = int(shared.arrays["status"][0])
+        final = iterations % 2
+        result = {
+            "x": shared.arrays["x"].copy(),
+            "lambda": shared.arrays["lam"][final].copy(),
+            "iterations": iterations,
+            "converged": bool(shared.arrays["status"][1]),
+            "wall_seconds": wall,
+            "seconds_per_iteration": wall / max(iterations, 1),
+            "n_robots": n_robots,
+            "n_workers": n_workers,
+            "dt": dt,
+        }
+    finally:
+        for w in workers:
+            if w.is_alive():
+                w.terminate()
+        shared.close(unlink=True)
+    return result
+
+
+if __name__ == "__main__":
+    import sys
+
+    n_robots = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    n_workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    rng = np.random.default_rng(0)
+    M = rng.uniform(0.01, 1, (n_robots, 5))
+    result = simulate_fleet(M, n_workers=n_workers)
+    x_min = robot_production_capacity(M).reshape(-1, N_TYPES).astype(float)
+    d = np.broadcast_to(-0.9 * x_min.sum(axis=0) / n_robots, x_min.shape)
+    x_star, _ = centralized_solution(np.ones_like(x_min), x_min, d)
+    print(f"{n_robots} robots on {result['n_workers']} processes: "
+          f"{result['iterations']} iterations in {result['wall_seconds']:.2f} s "
+          f"({1e6 * result['seconds_per_iteration']:.0f} us/iteration), converged={result['converged']}")
+    print(f"max |x - centralized| = {np.abs(result['x'] - x_star).max():.2e}")
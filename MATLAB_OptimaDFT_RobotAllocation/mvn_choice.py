@@ -0,0 +1,97 @@
+from functools import lru_cache
+
+import numpy as np
+from scipy.special import ndtr, ndtri
+from scipy.stats import qmc
+
+
+def difference_matrices(J):
+    """
+    L[j] maps preferences to P_j - P_i for every i != j, so that
+    P(alt j has max preference) = P(L[j] P > 0), a (J-1)-dimensional orthant
+    """
+    L = np.zeros((J, J - 1, J))
+    for j in range(J):
+        others = [i for i in range(J) if i != j]
+        L[j, :, j] = 1
+        L[j, np.arange(J - 1), others] = -1
+    return L
+
+
+class MVNChoiceIntegrator:
+    """
+    GHK estimator of MVN choice probabilities with fixed common random numbers.
+
+    The uniform draws are generated once (scrambled Sobol by default) and reused for
+    every trial and every parameter value, so probabilities are smooth functions of
+    E_P and V_P and can sit inside a likelihood that is being optimized.
+    :param n_alternatives: J
+    :param n_draws: draws per probability (rounded up to a power of two for Sobol)
+    :param method: "sobol", "halton" or "pseudo"
+    """
+
+    def __init__(self, n_alternatives, n_draws=256, method="sobol", seed=0):
+        self.J = n_alternatives
+        self.L = difference_matrices(n_alternatives)
+        dim = max(1, n_alternatives - 2)  # the last GHK dimension needs no draw
+        if method == "sobol":
+            m = int(np.ceil(np.log2(n_draws)))
+            draws = qmc.Sobol(d=dim, scramble=True, seed=seed).random_base2(m)
+        elif method == "halton":
+            draws = qmc.Halton(d=dim, scramble=True, seed=seed).random(n_draws)
+        elif method == "pseudo":
+            draws = np.random.default_rng(seed).random((n_draws, dim))
+        else:
+            raise ValueError(f"Unknown method {method}")
+        self.draws = np.clip(draws, 1e-12, 1 - 1e-12)
+
+    def orthant(self, m, Sigma):
+        """
+        P(Z < m) for Z ~ N(0, Sigma), batched: m (..., D), Sigma (..., D, D)
+        """
+        D = m.shape[-1]
+        if D == 1:
+            return ndtr(m[..., 0] / np.sqrt(Sigma[..., 0, 0]))
+        jitter = 1e-10 * np.trace(Sigma, axis1=-2, axis2=-1)[..., None, None] * np.eye(D)
+        C = np.linalg.cholesky(Sigma + jitter)
+        R = self.draws.shape[0]
+        e = np.zeros(m.shape[:-1] + (R, D))
+        prob = np.ones(m.shape[:-1] + (R,))
+        for i in range(D):
+            upper = (m[..., i, None] - np.einsum("...k,...rk->...r", C[..., i, :i], e[..., :i])) / C[..., i, i, None]
+            u = ndtr(upper)
+            prob = prob * u
+            if i < D - 1:
+                e[..., i] = ndtri(np.clip(self.draws[:, i] * u, 1e-300, 1 - 1e-16))
+        return prob.mean(axis=-1)
+
+    def probabilities(self, E_P, V_P):
+        """Choice probabilities for every alternative: E_P (N x J), V_P (N x J x J) -> N x J"""
+        E_P = np.atleast_2d(E_P)
+        V_P = np.asarray(V_P).reshape(-1, self.J, self.J)
+        V_P = 0.5 * (V_P + V_P.transpose(0, 2, 1))
+        m = np.einsum("jdk,nk->njd", self.L, E_P)
+        Sigma = np.einsum("jdk,nkl,jel->njde", self.L, V_P, self.L)
+        probs = self.orthant(m, Sigma)
+        return probs / probs.sum(axis=1, keepdims=True)
+
+    def chosen(self, E_P, V_P, choice):
+        """Probability of the chosen alternative only (0-based choice index per trial)"""
+        E_P = np.atleast_2d(E_P)
+        V_P = np.asarray(V_P).reshape(-1, self.J, self.J)
+        V_P = 0.5 * (V_P + V_P.transpose(0, 2, 1))
+        L = self.L[choice]
+        m = np.einsum("ndk,nk->nd", L, E_P)
+        Sigma = L @ V_P @ L.transpose(0, 2, 1)
+        return self.orthant(m, Sigma)
+
+
+@lru_cache(maxsize=16)
+def integrator(n_alternatives, n_draws=256, method="sobol", seed=0):
+    """Shared integrator per configuration, so the same draws are reused across calls"""
+    return MVNChoiceIntegrator(n_alternatives, n_draws, method, seed)
+
+
+def mvn_choice_probabilities(E_P, V_P, n_draws=256, method="sobol", seed=0):
+    E_P = np.atleast_2d(E_P)
+    return integrator(E_P.shape[1], n_draws, method, seed).probabilities(E_P, V_P)
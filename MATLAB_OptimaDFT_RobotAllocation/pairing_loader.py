@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from dft_dynamics import ATTRIBUTES
+
+ATTRIBUTE_COLUMNS = [f"robot{i}{attr}" for i in range(1, 4) for attr in ATTRIBUTES]
+STAKE_CODES = {"low": 0, "high": 1}  # anything else is stored as -1
+ANONYMOUS_IDS = {"", "anonymous"}  # dft.js sends "anonymous" for a missing participantId
+ARRAYS = ["M", "choice", "stake", "participant", "participant_ids", "trial"]
+_CACHE_VERSION = "2"
+
+
+def _count_rows(csv_path, block=1 << 24):
+    """Upper bound on the data rows (newlines minus the header), without parsing"""
+    lines, last = 0, b"\n"
+    with open(csv_path, "rb") as f:
+        while True:
+            buf = f.read(block)
+            if not buf:
+                break
+            lines += buf.count(b"\n")
+            last = buf[-1:]
+    return lines + (last != b"\n") - 1
+
+
+def _cache_key(csv_path, clip):
+    stat = os.stat(csv_path)
+    ident = f"{os.path.abspath(csv_path)}|{stat.st_size}|{stat.st_mtime_ns}|{clip}|{_CACHE_VERSION}"
+    return hashlib.sha1(ident.encode()).hexdigest()
+
+
+def _read_cache(directory):
+    arrays = {name: np.load(os.path.join(directory, name + ".npy"), mmap_mode="r") for name in ARRAYS}
+    with open(os.path.join(directory, "counts.json")) as f:
+        arrays.update(json.load(f))
+    return arrays
+
+
+def _write_cache(directory, arrays):
+    """Write all arrays to a scratch folder first, then move it into place in one rename"""
+    parent = os.path.dirname(directory)
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=parent)
+    try:
+        for name in ARRAYS:
+            np.save(os.path.join(tmp, name + ".npy"), arrays[name])
+        with open(os.path.join(tmp, "counts.json"), "w") as f:
+            json.dump({"n_dropped": arrays["n_dropped"], "n_clipped": arrays["n_clipped"]}, f)
+        os.replace(tmp, directory)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)  # another process cached it first
+
+
+def load_pairing_data(csv_path, chunksize=500_000, clip=True, cache_dir=None):
+    """
+    Load a pairing-data CSV (testTrial_Resource_Allocation_AllPairing.csv schema) into
+    compact arrays, reading chunksize rows at a time with explicit dtypes.
+
+    Column names are matched case-insensitively and rows with a choice outside 1-3 or a
+    missing attribute are dropped, as in apollo_Bridge / DFT_Resource_Allocation.R.
+    Attributes are clipped to 0.01-1 like the Apollo model unless clip=False.
+    :param cache_dir: folder for a .npy copy of the arrays; later loads of the unchanged
+                      file memory-map it instead of parsing the CSV
+    :return: dict with M (N x 3 x 5 float32), choice (int8, 1-3), stake (int8,
+             0 low / 1 high / -1 other), participant (int32 index into participant_ids,
+             -1 if missing or anonymous), participant_ids (the distinct participantid
+             strings), trial (int32), n_dropped (rows removed) and
+             n_clipped (attribute values outside 0.01-1)
+    """
+    if cache_dir is not None:
+        cached = os.path.join(cache_dir, _cache_key(csv_path, clip))
+        if os.path.isdir(cached):
+            return _read_cache(cached)
+
+    header = pd.read_csv(csv_path, nrows=0).columns
+    by_lower = {name.lower(): name for name in header}
+    required = ATTRIBUTE_COLUMNS + ["choice"]
+    missing = [name for name in required if name not in by_lower]
+    if missing:
+        raise ValueError(f"{csv_path} is missing columns: {', '.join(missing)}")
+    optional = [name for name in ["participantid", "trial", "staketype"] if name in by_lower]
+
+    dtypes = {by_lower[name]: np.float32 for name in ATTRIBUTE_COLUMNS}
+    dtypes[by_lower["choice"]] = np.float32  # float so missing values do not fail the read
+    for name in optional:
+        dtypes[by_lower[name]] = np.float64 if name == "trial" else "category"
+    usecols = [by_lower[name] for name in required + optional]
+
+    capacity = max(_count_rows(csv_path), 0)
+    M = np.empty((capacity, 3, len(ATTRIBUTES)), dtype=np.float32)
+    choice = np.empty(capacity, dtype=np.int8)
+    stake = np.full(capacity, -1, dtype=np.int8)
+    participant = np.full(capacity, -1, dtype=np.int32)
+    participant_codes = {}
+    trial = np.full(capacity, -1, dtype=np.int32)
+
+    n = n_dropped = n_clipped = 0
+    for chunk in pd.read_csv(csv_path, usecols=usecols, dtype=dtypes, chunksize=chunksize):
+        chunk.columns = chunk.columns.str.lower()
+        values = chunk[ATTRIBUTE_COLUMNS].to_numpy(dtype=np.float32)
+        c = chunk["choice"].to_numpy()
+        keep = np.isin(c, (1, 2, 3)) & ~np.isnan(values).any(axis=1)
+        k = int(keep.sum())
+        n_dropped += len(chunk) - k
+        if n + k > capacity:
+            raise ValueError(f"{csv_path} has more rows than lines")
+
+        values = values[keep].reshape(k, 3, len(ATTRIBUTES))
+        n_clipped += int(((values < 0.01) | (values > 1)).sum())
+        M[n:n + k] = np.clip(values, 0.01, 1) if clip else values
+        choice[n:n + k] = c[keep]
+        if "staketype" in chunk:
+            codes = chunk["staketype"].astype(str).str.lower().map(STAKE_CODES)
+            stake[n:n + k] = codes.fillna(-1).to_numpy(dtype=np.int8)[keep]
+        if "participantid" in chunk:
+            ids = chunk["participantid"].cat
+            # Categories differ between chunks, so map each to its code for the whole file;
+            # the trailing -1 is where a missing value's category code (-1) lands
+            lookup = np.array([-1 if str(label).strip().lower() in ANONYMOUS_IDS
+                               else participant_codes.setdefault(str(label), len(participant_codes))
+                               for label in ids.categories] + [-1], dtype=np.int32)
+            participant[n:n + k] = lookup[ids.codes.to_numpy()][keep]
+        if "trial" in chunk:
+            trial[n:n + k] = chunk["trial"].fillna(-1).to_numpy(dtype=np.int32)[keep]
+        n += k
+
+    arrays = {"M": M[:n], "choice": choice[:n], "stake": stake[:n],
+              "participant": participant[:n], "participant_ids": np.array(list(participant_codes), dtype=str),
+              "trial": trial[:n],
+              "n_dropped": n_dropped, "n_clipped": n_clipped}
+    if cache_dir is not None:
+        _write_cache(cached, arrays)
+    return arrays
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else "testTrial_Resource_Allocation_AllPairing.csv"
+    start = time.perf_counter()
+    arrays = load_pairing_data(csv_path)
+    print(f"{len(arrays['choice'])} trials ({arrays['n_dropped']} dropped, {arrays['n_clipped']} values clipped) in {time.perf_counter() - start:.2f} s, "
+          f"{arrays['M'].nbytes / 1e6:.1f} MB of attributes")
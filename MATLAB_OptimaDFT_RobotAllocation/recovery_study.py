@@ -0,0 +1,177 @@
+import argparse
+import json
+import logging
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from dft_dynamics import ATTRIBUTES
+from dft_estimator import APOLLO_BETA, APOLLO_FIXED, PARAM_NAMES, estimate, simulate_choices
+
+log = logging.getLogger(__name__)
+
+# Ranges the ground-truth parameters are drawn from (raw Apollo scale)
+TRUTH_RANGES = {
+    "asc_1": (-0.5, 0.5), "asc_2": (-0.5, 0.5),
+    "b_energy": (-1.0, 1.0), "b_pace": (-1.0, 1.0), "b_safety": (-1.0, 1.0), "b_intelligence": (-1.0, 1.0),
+    "phi1": (0.2, 1.5), "phi2": (0.05, 0.5),
+    "error_sd": (0.2, 1.0), "timesteps": (0.5, 2.5),
+}
+
+
+def draw_truth(rng):
+    """One ground-truth parameter vector; fixed parameters keep their APOLLO_BETA value"""
+    theta = np.array([APOLLO_BETA[name] for name in PARAM_NAMES], dtype=float)
+    for i, name in enumerate(PARAM_NAMES):
+        if name in TRUTH_RANGES and name not in APOLLO_FIXED:
+            theta[i] = rng.uniform(*TRUTH_RANGES[name])
+    return theta
+
+
+def simulate_dataset(theta, n_trials, seed):
+    """Random robot attributes (0.3-0.9, as in the study) and DFT choices, in the pairing-data schema"""
+    rng = np.random.default_rng(seed)
+    M = np.round(rng.uniform(0.3, 0.9, (n_trials, 3, len(ATTRIBUTES))), 2)
+    data = {"trial": np.arange(1, n_trials + 1), "choice": simulate_choices(theta, M, seed=seed)}
+    for i in range(3):
+        for k, attr in enumerate(ATTRIBUTES):
+            data[f"robot{i + 1}{attr}"] = M[:, i, k]
+    return pd.DataFrame(data)
+
+
+def run_replication(rep, seed, n_trials, n_starts):
+    """Draw truth, simulate and fit one dataset (module level so it can run in a process pool)"""
+    rng = np.random.default_rng([seed, rep])
+    theta = draw_truth(rng)
+    data = simulate_dataset(theta, n_trials, int(rng.integers(2 ** 31)))
+    try:
+        model = estimate(data, n_starts=n_starts, n_jobs=1)
+    except Exception as e:
+        return {"rep": rep, "truth": dict(zip(PARAM_NAMES, theta.tolist())), "error": str(e)}
+    return {
+        "rep": rep,
+        "truth": dict(zip(PARAM_NAMES, theta.tolist())),
+        "estimate": model["estimate"],
+        "se": model["se"],
+        "logLike": model["logLike"],
+        "converged": model["converged"],
+    }
+
+
+def load_checkpoint(path, config):
+    """
+    Finished replications from a previous run of the same study (JSON lines).
+    Lines that do not parse (torn writes from an interrupted run) are skipped.
+    """
+    done = {}
+    if not os.path.isfile(path):
+        return done
+    with open(path) as f:
+        lines = f.read().splitlines()
+    try:
+        header = json.loads(lines[0]) if lines else None
+    except json.JSONDecodeError:
+        return done  # interrupted while writing the header, so nothing was fitted
+    if header is None:
+        return done
+    if header.get("config") != config:
+        raise ValueError(f"{path} belongs to a study with a different configuration")
+    for line in lines[1:]:
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        done[record["rep"]] = record
+    return done
+
+
+def _write_checkpoint(path, config, done):
+    """Rewrite the checkpoint with only complete records, so appends never land on a torn line"""
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile("w", dir=directory, suffix=".jsonl", delete=False) as f:
+        f.write(json.dumps({"config": config}) + "\n")
+        for rep in sorted(done):
+            f.write(json.dumps(done[rep]) + "\n")
+    os.replace(f.name, path)
+
+
+def run_study(n_reps=100, n_trials=300, n_starts=1, seed=0, checkpoint="recovery_checkpoint.jsonl", n_jobs=None):
+    """
+    Parameter recovery over n_reps simulated datasets, fitted in a process pool.
+
+    Every finished replication is appended to the checkpoint file, so rerunning the
+    same call after an interruption only fits the missing ones. Replication seeds
+    depend only on (seed, rep), so a finished study can also be extended with more reps.
+    :return: list of replication records (sorted by rep)
+    """
+    config = {"n_trials": n_trials, "n_starts": n_starts, "seed": seed}
+    done = load_checkpoint(checkpoint, config)
+    _write_checkpoint(checkpoint, config, done)
+    pending = [rep for rep in range(n_reps) if rep not in done]
+    log.info("%d replications in checkpoint, %d to run", len(done), len(pending))
+
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool, open(checkpoint, "a") as f:
+        futures = [pool.submit(run_replication, rep, seed, n_trials, n_starts) for rep in pending]
+        for i, future in enumerate(as_completed(futures), 1):
+            record = future.result()
+            done[record["rep"]] = record
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            if i % 10 == 0 or i == len(futures):
+                log.info("%d/%d replications done", len(done), n_reps)
+    return [done[rep] for rep in sorted(done) if rep < n_reps]
+
+
+def summarize(records, level=0.95):
+    """
+    Bias, RMSE and Wald-interval coverage per free parameter; the median error is
+    included because a few degenerate fits (e.g. phi2 running off) dominate the mean
+    """
+    from scipy.stats import norm
+
+    z = norm.ppf(0.5 + level / 2)
+    fitted = [r for r in records if "estimate" in r]
+    rows = []
+    for name in PARAM_NAMES:
+        if name in APOLLO_FIXED:
+            continue
+        truth = np.array([r["truth"][name] for r in fitted])
+        est = np.array([r["estimate"][name] for r in fitted])
+        se = np.array([r["se"][name] for r in fitted], dtype=float)
+        err = est - truth
+        has_se = np.isfinite(se)
+        rows.append({
+            "parameter": name,
+            "bias": err.mean(),
+            "median_error": np.median(err),
+            "rmse": np.sqrt((err ** 2).mean()),
+            "coverage": (np.abs(err[has_se]) <= z * se[has_se]).mean() if has_se.any() else np.nan,
+            "n": len(err),
+            "n_with_se": int(has_se.sum()),
+        })
+    table = pd.DataFrame(rows).set_index("parameter")
+    table.attrs["converged"] = float(np.mean([r["converged"] for r in fitted])) if fitted else np.nan
+    table.attrs["failed"] = len(records) - len(fitted)
+    return table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="DFT parameter recovery study")
+    parser.add_argument("--reps", type=int, default=100)
+    parser.add_argument("--trials", type=int, default=300)
+    parser.add_argument("--starts", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--jobs", type=int, default=None)
+    parser.add_argument("--checkpoint", default="recovery_checkpoint.jsonl")
+    parser.add_argument("--output", default="recovery_summary.csv")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    records = run_study(args.reps, args.trials, args.starts, args.seed, args.checkpoint, args.jobs)
+    table = summarize(records)
+    print(table.to_string(float_format=lambda v: f"{v:.3f}"))
+    print(f"converged: {table.attrs['converged']:.1%}, failed fits: {table.attrs['failed']}")
+    table.to_csv(args.output)
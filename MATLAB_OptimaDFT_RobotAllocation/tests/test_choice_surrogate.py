@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from choice_surrogate import ChoiceSurrogate, GRID_HIGH, GRID_LOW, _exact, load_surrogate
+from dft_estimator import APOLLO_BETA, PARAM_NAMES
+
+THETA = np.array([APOLLO_BETA[name] for name in PARAM_NAMES], dtype=float)
+COMPETITORS = [[0.4, 0.5, 0.9, 0.6, 0.8], [0.7, 0.6, 0.6, 0.8, 0.9]]
+
+
+@pytest.fixture(scope="module")
+def surrogate():
+    return ChoiceSurrogate.build(THETA, COMPETITORS, levels=7, n_validation=256)
+
+
+def test_interpolation_error_is_small_and_reported(surrogate):
+    x = np.random.default_rng(0).uniform(GRID_LOW, GRID_HIGH, (500, 5))
+    prob, bound = surrogate.lookup(x)
+    err = np.abs(prob - _exact(THETA, surrogate.competitors, x))
+    assert err.max() < 2e-3
+    assert surrogate.validation["max_abs_error"] < 2e-3
+    # the corner spread bounds the error (the probability is monotone at phi2 = 0)
+    assert np.all(err <= bound + 1e-6)
+
+
+def test_grid_points_are_reproduced_exactly(surrogate):
+    axis = np.linspace(GRID_LOW, GRID_HIGH, surrogate.levels)
+    x = np.array([[axis[0], axis[3], axis[6], axis[2], axis[5]]])
+    prob, _ = surrogate.lookup(x)
+    np.testing.assert_allclose(prob, _exact(THETA, surrogate.competitors, x), atol=1e-6)
+
+
+def test_cached_surrogate_round_trips(tmp_path):
+    built = load_surrogate(THETA, COMPETITORS, levels=5, cache_dir=str(tmp_path))
+    cached = load_surrogate(THETA, COMPETITORS, levels=5, cache_dir=str(tmp_path))
+    np.testing.assert_array_equal(built.values, cached.values)
+    assert cached.validation == built.validation
+    x = [0.5, 0.5, 0.5, 0.5, 0.5]
+    assert cached.lookup(x) == built.lookup(x)
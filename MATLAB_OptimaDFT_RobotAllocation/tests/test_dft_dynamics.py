@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from dft_dynamics import dft_matrices, preference_moments
+
+
+def iterated_moments(phi1, phi2, tau, epsilon, beta, M, initial_P, w):
+    """E_P and V_P by running P_t+1 = S P_t + V_t for tau steps, one trial at a time"""
+    S, mu, Phi = dft_matrices(phi1, phi2, epsilon, beta, M, w)
+    E, V = [], []
+    for n in range(len(M)):
+        e, v = np.array(initial_P, dtype=float), np.zeros_like(Phi[n])
+        for _ in range(tau):
+            e = S[n] @ e + mu[n]
+            v = S[n] @ v @ S[n].T + Phi[n]
+        E.append(e)
+        V.append(v)
+    return np.array(E), np.array(V)
+
+
+@pytest.mark.parametrize("phi1, phi2", [(0.5, 0.3), (2.0, 0.9), (1.0, 0.0)])
+def test_closed_form_moments_match_iteration(phi1, phi2):
+    rng = np.random.default_rng(0)
+    M = rng.uniform(0.01, 1, (6, 3, 5))
+    w = rng.uniform(0.1, 1, 5)
+    initial_P = [0.2, -0.1, 0.0]
+    expected = iterated_moments(phi1, phi2, 7, 0.3, 1.0, M, initial_P, w)
+    E_P, V_P = preference_moments(phi1, phi2, 7, 0.3, 1.0, M, initial_P, w)
+    np.testing.assert_allclose(E_P, expected[0], rtol=1e-10, atol=1e-12)
+    np.testing.assert_allclose(V_P, expected[1], rtol=1e-10, atol=1e-12)
+
+
+def test_identical_robots_get_identical_moments():
+    M = np.tile(np.random.default_rng(1).uniform(0.01, 1, (1, 1, 5)), (1, 3, 1))
+    E_P, V_P = preference_moments(0.8, 0.4, 5, 0.3, 1.0, M)
+    np.testing.assert_allclose(E_P, 0, atol=1e-12)
+    np.testing.assert_allclose(np.diag(V_P[0]), V_P[0, 0, 0])
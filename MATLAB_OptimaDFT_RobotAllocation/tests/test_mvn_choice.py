@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from dft_estimator import bvn_cdf
+from mvn_choice import MVNChoiceIntegrator, mvn_choice_probabilities
+
+
+def random_moments(n_trials, J, seed):
+    rng = np.random.default_rng(seed)
+    E_P = rng.normal(0, 0.5, (n_trials, J))
+    A = rng.normal(0, 0.4, (n_trials, J, J))
+    V_P = A @ A.transpose(0, 2, 1) + 0.1 * np.eye(J)
+    return E_P, V_P
+
+
+def monte_carlo(E_P, V_P, n_draws=200_000, seed=1):
+    rng = np.random.default_rng(seed)
+    probs = []
+    for m, V in zip(E_P, V_P):
+        P = rng.multivariate_normal(m, V, n_draws)
+        probs.append(np.bincount(P.argmax(axis=1), minlength=len(m)) / n_draws)
+    return np.array(probs)
+
+
+@pytest.mark.parametrize("method", ["sobol", "halton"])
+def test_ghk_matches_monte_carlo_for_six_alternatives(method):
+    E_P, V_P = random_moments(4, 6, seed=0)
+    ghk = mvn_choice_probabilities(E_P, V_P, n_draws=1024, method=method)
+    np.testing.assert_allclose(ghk.sum(axis=1), 1)
+    # 200k Monte Carlo draws have a standard error below 1.2e-3
+    np.testing.assert_allclose(ghk, monte_carlo(E_P, V_P), atol=6e-3)
+
+
+def test_three_alternatives_match_the_exact_bivariate_normal():
+    E_P, V_P = random_moments(5, 3, seed=2)
+    integrator = MVNChoiceIntegrator(3, n_draws=64)
+    m = np.einsum("jdk,nk->njd", integrator.L, E_P)
+    Sigma = np.einsum("jdk,nkl,jel->njde", integrator.L, V_P, integrator.L)
+    s = np.sqrt(np.diagonal(Sigma, axis1=2, axis2=3))
+    exact = bvn_cdf(m[..., 0] / s[..., 0], m[..., 1] / s[..., 1], Sigma[..., 0, 1] / (s[..., 0] * s[..., 1]))[0]
+    # J = 3 needs only one GHK draw dimension, whose last step is exact
+    np.testing.assert_allclose(integrator.orthant(m, Sigma), exact, atol=1e-3)
+
+
+def test_common_random_numbers_give_a_smooth_probability():
+    E_P, V_P = random_moments(1, 6, seed=3)
+    integrator = MVNChoiceIntegrator(6, n_draws=256)
+    shifts = np.linspace(0, 0.05, 6)
+    probs = np.array([integrator.probabilities(E_P + [[s, 0, 0, 0, 0, 0]], V_P)[0, 0] for s in shifts])
+    steps = np.diff(probs)
+    assert np.all(steps > 0)  # raising alternative 1's mean always raises its probability
+    np.testing.assert_allclose(steps, steps.mean(), rtol=0.1)
+
+
+def test_chosen_matches_probabilities():
+    E_P, V_P = random_moments(8, 5, seed=4)
+    integrator = MVNChoiceIntegrator(5)
+    choice = np.arange(8) % 5
+    probs = integrator.probabilities(E_P, V_P)
+    raw = integrator.chosen(E_P, V_P, choice)
+    # probabilities() renormalizes the rows; the raw orthant values already sum to about 1
+    np.testing.assert_allclose(raw, probs[np.arange(8), choice], rtol=5e-3)
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from dft_dynamics import attribute_tensor
+from pairing_loader import load_pairing_data
+from synthetic_data import generate_pairing_data
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    data = generate_pairing_data(3, 10)
+    data.loc[2, "choice"] = 4  # dropped: not a robot
+    data.loc[5, "robot2pace"] = np.nan  # dropped: missing attribute
+    data.loc[7, "robot1energy"] = 1.4  # clipped to 1
+    data.loc[8, "staketype"] = "medium"
+    data.columns = [c.upper() if c.startswith("robot1") else c for c in data.columns]
+    path = tmp_path / "pairing.csv"
+    data.to_csv(path, index=False)
+    return str(path), data
+
+
+def test_arrays_match_the_csv_rows(csv_path):
+    path, data = csv_path
+    # chunks smaller than the file exercise the chunk boundaries
+    arrays = load_pairing_data(path, chunksize=7)
+    kept = data.drop(index=[2, 5])
+    kept.columns = kept.columns.str.lower()
+
+    assert arrays["n_dropped"] == 2 and arrays["n_clipped"] == 1
+    assert arrays["M"].dtype == np.float32 and arrays["M"].shape == (28, 3, 5)
+    np.testing.assert_allclose(arrays["M"], np.clip(attribute_tensor(kept), 0.01, 1), rtol=1e-6)
+    np.testing.assert_array_equal(arrays["choice"], kept["choice"])
+    np.testing.assert_array_equal(arrays["participant_ids"][arrays["participant"]], kept["participantid"].astype(str))
+    np.testing.assert_array_equal(arrays["trial"], kept["trial"])
+    expected_stake = kept["staketype"].map({"low": 0, "high": 1}).fillna(-1)
+    np.testing.assert_array_equal(arrays["stake"], expected_stake)
+
+
+def test_participant_ids_need_not_be_numeric(tmp_path):
+    data = generate_pairing_data(4, 3)
+    labels = dict(zip(data["participantid"].unique(), ["P-07", "anonymous", "", "x1"]))
+    data["participantid"] = data["participantid"].map(labels)
+    path = tmp_path / "ids.csv"
+    data.to_csv(path, index=False)
+
+    arrays = load_pairing_data(str(path), chunksize=4)
+    ids = [arrays["participant_ids"][code] if code >= 0 else None for code in arrays["participant"]]
+    assert ids == [None if label in ("anonymous", "") else label for label in data["participantid"]]
+
+
+def test_clip_false_keeps_raw_values(csv_path):
+    path, _ = csv_path
+    assert load_pairing_data(path, clip=False)["M"].max() == np.float32(1.4)
+
+
+def test_missing_column_is_rejected(tmp_path):
+    path = tmp_path / "bad.csv"
+    generate_pairing_data(1, 5).drop(columns="robot3safety").to_csv(path, index=False)
+    with pytest.raises(ValueError, match="robot3safety"):
+        load_pairing_data(str(path))
+
+
+def test_cache_is_memory_mapped_and_invalidated(csv_path, tmp_path):
+    path, data = csv_path
+    cache = str(tmp_path / "cache")
+    first = load_pairing_data(path, cache_dir=cache)
+    cached = load_pairing_data(path, cache_dir=cache)
+    assert isinstance(cached["M"], np.memmap)
+    np.testing.assert_array_equal(cached["M"], first["M"])
+    assert cached["n_dropped"] == first["n_dropped"]
+
+    data.iloc[:4].to_csv(path, index=False)  # a changed file must not be served from the cache
+    assert len(load_pairing_data(path, cache_dir=cache)["choice"]) < len(first["choice"])
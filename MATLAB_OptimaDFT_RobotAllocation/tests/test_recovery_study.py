@@ -0,0 +1,26 @@
+import json
+
+from recovery_study import _write_checkpoint, load_checkpoint
+
+CONFIG = {"n_trials": 40, "n_starts": 1, "seed": 0}
+
+
+def test_resume_after_torn_line_keeps_later_records(tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    records = [json.dumps({"rep": rep, "logLike": -1.0}) for rep in range(4)]
+    # rep 1 was torn by an interruption and a later run appended rep 2 onto it
+    path.write_text("\n".join([json.dumps({"config": CONFIG}), records[0], records[1][:10] + records[2], records[3]]))
+
+    done = load_checkpoint(str(path), CONFIG)
+    assert sorted(done) == [0, 3]
+
+    _write_checkpoint(str(path), CONFIG, done)
+    with open(path, "a") as f:
+        f.write(records[1] + "\n")
+    assert sorted(load_checkpoint(str(path), CONFIG)) == [0, 1, 3]
+
+
+def test_torn_header_starts_over(tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    path.write_text('{"config": {"n_tri')
+    assert load_checkpoint(str(path), CONFIG) == {}
@@ -34,6 +34,12 @@ robots = [
 ]
 selected_robot = None
 
+FPS = 60
+RADAR_POS = (400, 200)
+SELECTED_POS = (50, 300)
+OVERLAY_POS = (WIDTH - 170, HEIGHT - 30)
+small_font = pygame.font.Font(None, 24)
+
 def generate_radar_chart(robot):
     labels = np.array(["Charge", "Production"])
     stats = np.array([robot['charge'], robot['production']])
@@ -53,12 +59,59 @@ def generate_radar_chart(robot):
     plt.savefig(buf, format="PNG", bbox_inches='tight')
     plt.close(fig)
     buf.seek(0)
-    return pygame.image.load(buf)
+    return pygame.image.load(buf).convert()
+
+# Radar surfaces per robot id, rendered again only when charge or production change
+radar_cache = {}
+
+def get_radar_chart(robot):
+    state = (robot['charge'], robot['production'])
+    cached = radar_cache.get(robot['id'])
+    if cached is None or cached[0] != state:
+        cached = (state, generate_radar_chart(robot))
+        radar_cache[robot['id']] = cached
+    return cached[1]
+
+def draw_background():
+    screen.fill(WHITE)
+    # Display Payoff Matrix
+    y_offset = 100
+    for robot in robots:
+        text = font.render(f"Robot {robot['id']}: Press {robot['id']} to select", True, BLACK)
+        screen.blit(text, (50, y_offset))
+        y_offset += 40
+
+def draw_selection(robot, previous_rects):
+    """Redraw only the selection area; returns the rects that changed"""
+    for rect in previous_rects:
+        screen.fill(WHITE, rect)
+    rects = []
+    if robot:
+        rects.append(screen.blit(get_radar_chart(robot), RADAR_POS))
+        text = font.render(f"Selected Robot: {robot['id']}", True, RED)
+        rects.append(screen.blit(text, SELECTED_POS))
+    return previous_rects + rects, rects
+
+def draw_overlay(fps, work_ms, previous_rect):
+    if previous_rect:
+        screen.fill(WHITE, previous_rect)
+    text = small_font.render(f"{fps:5.1f} FPS {work_ms:4.1f} ms", True, BLACK)
+    return screen.blit(text, OVERLAY_POS)
 
 # Game Loop
+clock = pygame.time.Clock()
+draw_background()
+pygame.display.flip()
+shown_state = None
+selection_rects = []
+overlay_rect = None
+frame_times = []
 running = True
 while running:
-    screen.fill(WHITE)
+    # Cap the loop at FPS; tick() sleeps for the rest of the frame
+    clock.tick(FPS)
+    frame_times.append(clock.get_rawtime())  # time spent on the previous frame, without the sleep
+    dirty = []
     
     # Event Handling
     for event in pygame.event.get():
@@ -72,20 +125,23 @@ while running:
             elif event.key == pygame.K_3:
                 selected_robot = robots[2]
     
-    # Display Payoff Matrix
-    y_offset = 100
-    for robot in robots:
-        text = font.render(f"Robot {robot['id']}: Press {robot['id']} to select", True, BLACK)
-        screen.blit(text, (50, y_offset))
-        y_offset += 40
+    # Display Selected Robot's Radar Chart when the selection or its state changed
+    state = selected_robot and (selected_robot['id'], selected_robot['charge'], selected_robot['production'])
+    if state != shown_state:
+        changed, selection_rects = draw_selection(selected_robot, selection_rects)
+        dirty += changed
+        shown_state = state
     
-    # Display Selected Robot's Radar Chart
-    if selected_robot:
-        radar_chart = generate_radar_chart(selected_robot)
-        screen.blit(radar_chart, (400, 200))
-        text = font.render(f"Selected Robot: {selected_robot['id']}", True, RED)
-        screen.blit(text, (50, 300))
+    # Frame-time overlay, refreshed twice a second
+    if len(frame_times) >= FPS // 2:
+        work_ms = sum(frame_times) / len(frame_times)
+        frame_times = []
+        if overlay_rect:
+            dirty.append(overlay_rect)
+        overlay_rect = draw_overlay(clock.get_fps(), work_ms, overlay_rect)
+        dirty.append(overlay_rect)
     
-    pygame.display.flip()
+    if dirty:
+        pygame.display.update(dirty)
 
 pygame.quit()
@@ -1,12 +1,33 @@
+import os
+import sys
+import threading
 import tkinter as tk
 from tkinter import ttk, messagebox
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import json
-import os
 from datetime import datetime
 
+from trial_log import TrialLog
+from trial_stats import TrialStats
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'MATLAB_OptimaDFT_RobotAllocation'))
+from choice_surrogate import load_surrogate  # noqa: E402
+from dft_estimator import APOLLO_BETA, PARAM_NAMES, predict_choices  # noqa: E402
+
+# Task-role profiles (as in Figma/Version2/testGUI.py). A robot adjusted for one role
+# competes with the profiles of the other two in the DFT choice model.
+ROLE_PROFILES = {
+    "Delivery": {"Energy": 0.6, "Pace": 0.8, "Safety": 0.5, "Reliability": 0.7, "Intelligence": 0.6},
+    "Inspection": {"Energy": 0.4, "Pace": 0.5, "Safety": 0.9, "Reliability": 0.6, "Intelligence": 0.8},
+    "Assembling": {"Energy": 0.7, "Pace": 0.6, "Safety": 0.6, "Reliability": 0.8, "Intelligence": 0.9}
+}
+
+# Apollo-scale DFT parameters behind the predictions; replace with the participant's
+# estimate (e.g. from /estimate_dft). Surrogate grids are cached in SURROGATE_CACHE.
+MODEL_PARAMS = dict(APOLLO_BETA)
+SURROGATE_CACHE = "surrogate_cache"
+
 class RobotAdjustmentApp:
     def __init__(self, root):
         self.root = root
@@ -15,7 +36,7 @@ class RobotAdjustmentApp:
         
         # Initialize data storage
         self.participant_data = {
-            "participant_id": np.random.randint(1000, 9999),
+            "participant_id": int(np.random.randint(1000, 9999)),
             "trials": [],
             "current_trial": 0
         }
@@ -24,6 +45,19 @@ class RobotAdjustmentApp:
         self.roles = ["Delivery", "Inspection", "Assembling"]
         self.attributes = ["Energy", "Pace", "Safety", "Reliability", "Intelligence"]
         
+        # Trials are appended to participant_<id>.jsonl and compacted on close
+        self.trial_log = TrialLog(self.participant_data["participant_id"])
+        self.root.protocol("WM_DELETE_WINDOW", self.end_session)
+        
+        # Analysis statistics are updated per saved trial; the window is built once
+        self.stats = TrialStats(self.attributes)
+        self.analysis_win = None
+        
+        # Choice-probability surrogate per role, built (or loaded) on a background thread
+        # so no redraw waits for a grid; the exact model answers until it is ready
+        self.surrogates = {}
+        threading.Thread(target=self._build_surrogates, name="surrogates", daemon=True).start()
+        
         # Create GUI components
         self.create_widgets()
         
@@ -60,6 +94,9 @@ class RobotAdjustmentApp:
             ttk.Progressbar(frame, orient=tk.HORIZONTAL, length=200, 
                           mode='determinate', variable=tk.DoubleVar(value=0)).pack(side=tk.LEFT, padx=5)
         
+        self.choice_label = ttk.Label(self.prediction_frame, text="")
+        self.choice_label.pack(anchor=tk.W, pady=2)
+        
         # Adjustment sliders
         self.adjustment_frame = ttk.LabelFrame(self.main_frame, text="Adjust Attributes", padding="10")
         self.adjustment_frame.pack(fill=tk.X, pady=5)
@@ -103,6 +140,7 @@ class RobotAdjustmentApp:
         self.fig, self.ax = plt.subplots(figsize=(6, 4))
         self.canvas = FigureCanvasTkAgg(self.fig, master=self.viz_frame)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.create_chart()
         
         # Control buttons
         self.control_frame = ttk.Frame(self.main_frame)
@@ -120,16 +158,43 @@ class RobotAdjustmentApp:
         self.generate_prediction()
         self.update_chart()
     
+    def _competitors(self, role):
+        return [[profile[attr] for attr in self.attributes]
+                for other, profile in ROLE_PROFILES.items() if other != role]
+    
+    def _build_surrogates(self):
+        """Runs off the Tk thread: only fills self.surrogates, never touches widgets"""
+        theta = [MODEL_PARAMS[name] for name in PARAM_NAMES]
+        for role in ROLE_PROFILES:
+            self.surrogates[role] = load_surrogate(theta, self._competitors(role), cache_dir=SURROGATE_CACHE)
+    
+    def choice_probability(self, role, values):
+        """
+        DFT probability of choosing a robot with these attributes for the role over the
+        other two role profiles, as predict_choices gives it: read from the role's
+        surrogate once it is built, computed exactly until then
+        :return: probability, description of its accuracy
+        """
+        surrogate = self.surrogates.get(role)
+        if surrogate is None:
+            theta = np.array([MODEL_PARAMS[name] for name in PARAM_NAMES], dtype=float)
+            M = np.clip(np.array([[list(values)] + self._competitors(role)], dtype=float), 0.01, 1)
+            return float(predict_choices(theta, M)[0][0, 0]), "exact"
+        probability, _ = surrogate.lookup(values)
+        return probability, f"surrogate error ≤ {surrogate.validation['max_abs_error']:.3f}"
+    
     def generate_prediction(self):
-        """Generate a mock prediction (replace with your actual model)"""
+        """
+        Predicted attributes: the profile of the selected role, the robot the DFT model
+        scores against the other two roles (its choice probability is shown for the
+        slider settings)
+        """
         role = self.role_var.get()
         
-        # Mock prediction - in practice, replace with your MATLAB/Python model
-        np.random.seed(hash(role) % 1000)  # For consistent "predictions" per role
-        self.current_prediction = {
-            attr: np.clip(np.random.normal(loc=0.5, scale=0.2), 0, 1)
-            for attr in self.attributes
-        }
+        if role in ROLE_PROFILES:
+            self.current_prediction = dict(ROLE_PROFILES[role])
+        else:
+            self.current_prediction = {attr: 0.5 for attr in self.attributes}
         
         # Update prediction display
         for attr, value in self.current_prediction.items():
@@ -139,36 +204,77 @@ class RobotAdjustmentApp:
     def update_slider_value(self, attr):
         """Update displayed slider value"""
         value = self.slider_vars[attr].get()
-        self.slider_vars[attr].set(round(value, 2))
+        if round(value, 2) != value:
+            self.slider_vars[attr].set(round(value, 2))
+    
+    def create_chart(self):
+        """Draw the static parts of the radar chart once; the polygons are blitted on top"""
+        self.angles = np.linspace(0, 2 * np.pi, len(self.attributes), endpoint=False)
+        self.angles = np.concatenate((self.angles, [self.angles[0]]))
+        zeros = np.zeros_like(self.angles)
+        
+        # Animated artists are skipped by canvas.draw() and drawn in _on_chart_draw / _redraw_chart
+        self.pred_line, = self.ax.plot(self.angles, zeros, 'o-', linewidth=2, label='Prediction', animated=True)
+        self.pred_fill, = self.ax.fill(self.angles, zeros, alpha=0.25, animated=True)
+        self.user_line, = self.ax.plot(self.angles, zeros, 'o-', linewidth=2, label='Your Adjustment', animated=True)
+        self.user_fill, = self.ax.fill(self.angles, zeros, alpha=0.25, animated=True)
+        self.chart_artists = [self.pred_fill, self.pred_line, self.user_fill, self.user_line]
+        
+        self.ax.set_xticks(self.angles[:-1])
+        self.ax.set_xticklabels(self.attributes)
+        self.ax.set_yticks([0, 0.5, 1])
+        self.ax.set_xlim(-0.2, 2 * np.pi + 0.2)
+        self.ax.set_ylim(-0.05, 1.05)
+        self.ax.legend(loc='upper right')
+        
+        self.chart_background = None
+        self.chart_pending = None
+        self.canvas.mpl_connect("draw_event", self._on_chart_draw)
+    
+    def _on_chart_draw(self, event):
+        """Cache the static background after every full draw (first show, resize, title change)"""
+        self.chart_background = self.canvas.copy_from_bbox(self.fig.bbox)
+        for artist in self.chart_artists:
+            self.ax.draw_artist(artist)
     
     def update_chart(self, *args):
+        """Schedule a radar chart update; bursts of variable writes collapse into one redraw"""
+        if self.chart_pending is None:
+            self.chart_pending = self.root.after_idle(self._redraw_chart)
+    
+    def _redraw_chart(self):
         """Update the radar chart visualization"""
-        self.ax.clear()
+        self.chart_pending = None
         
         # Prepare data
-        pred_values = list(self.current_prediction.values())
+        pred_values = [self.current_prediction[attr] for attr in self.attributes]
         user_values = [self.slider_vars[attr].get() for attr in self.attributes]
-        
-        # Radar chart
-        angles = np.linspace(0, 2 * np.pi, len(self.attributes), endpoint=False)
-        angles = np.concatenate((angles, [angles[0]]))
-        
         pred_values = np.concatenate((pred_values, [pred_values[0]]))
         user_values = np.concatenate((user_values, [user_values[0]]))
         
-        self.ax.plot(angles, pred_values, 'o-', linewidth=2, label='Prediction')
-        self.ax.fill(angles, pred_values, alpha=0.25)
-        
-        self.ax.plot(angles, user_values, 'o-', linewidth=2, label='Your Adjustment')
-        self.ax.fill(angles, user_values, alpha=0.25)
+        self.pred_line.set_ydata(pred_values)
+        self.pred_fill.set_xy(np.column_stack((self.angles, pred_values)))
+        self.user_line.set_ydata(user_values)
+        self.user_fill.set_xy(np.column_stack((self.angles, user_values)))
         
-        self.ax.set_xticks(angles[:-1])
-        self.ax.set_xticklabels(self.attributes)
-        self.ax.set_yticks([0, 0.5, 1])
-        self.ax.set_title(f"Attribute Comparison - {self.role_var.get()}")
-        self.ax.legend(loc='upper right')
+        role = self.role_var.get()
+        if role in ROLE_PROFILES:
+            probability, accuracy = self.choice_probability(role, user_values[:-1])
+            self.choice_label.config(text=f"Choice probability vs. the other roles: {probability:.2f} ({accuracy})")
+        else:
+            self.choice_label.config(text="")
+        
+        title = f"Attribute Comparison - {self.role_var.get()}"
+        if title != self.ax.get_title() or self.chart_background is None:
+            # Static content changed: full draw, which re-caches the background
+            self.ax.set_title(title)
+            self.canvas.draw()
+            return
         
-        self.canvas.draw()
+        self.canvas.restore_region(self.chart_background)
+        for artist in self.chart_artists:
+            self.ax.draw_artist(artist)
+        self.canvas.blit(self.fig.bbox)
     
     def save_configuration(self):
         """Save the current adjustment and rating"""
@@ -193,15 +299,19 @@ class RobotAdjustmentApp:
         
         self.participant_data["trials"].append(trial_data)
         self.participant_data["current_trial"] += 1
+        self.stats.add(trial_data)
         
-        # Save to file
-        os.makedirs("participant_data", exist_ok=True)
-        filename = f"participant_data/participant_{self.participant_data['participant_id']}.json"
-        with open(filename, 'w') as f:
-            json.dump(self.participant_data, f, indent=2)
+        # Save to file (one appended line per trial)
+        self.trial_log.append(trial_data)
         
         messagebox.showinfo("Saved", "Configuration saved successfully!")
     
+    def end_session(self):
+        """Write the consolidated participant file and close the window"""
+        if self.participant_data["trials"]:
+            self.trial_log.compact()
+        self.root.destroy()
+    
     def new_trial(self):
         """Start a new trial"""
         if len(self.participant_data["trials"]) > 0:
@@ -219,59 +329,71 @@ class RobotAdjustmentApp:
             messagebox.showerror("Error", "No trial data to analyze")
             return
         
-        # Create analysis window
-        analysis_win = tk.Toplevel(self.root)
-        analysis_win.title("Analysis Results")
-        analysis_win.geometry("800x600")
-        
-        # Calculate metrics
-        trials = self.participant_data["trials"]
-        mae = {
-            attr: np.mean([abs(t["differences"][attr]) for t in trials])
-            for attr in self.attributes
-        }
-        
-        satisfaction = [t["satisfaction"] for t in trials]
-        avg_accuracy = [
-            1 - np.mean(list(t["differences"].values()))
-            for t in trials
-        ]
+        if self.analysis_win is None:
+            self.create_analysis_window()
+        
+        # Update the existing artists from the running statistics
+        mae = self.stats.mae()
+        std = self.stats.mae_std()
+        for bar, attr in zip(self.mae_bars, self.attributes):
+            bar.set_height(mae[attr])
+        self.mae_spread.set_segments([
+            [(i, max(mae[attr] - std[attr], 0)), (i, mae[attr] + std[attr])]
+            for i, attr in enumerate(self.attributes)
+        ])
+        
+        accuracy, satisfaction, counts = self.stats.grid()
+        self.sat_points.set_offsets(np.column_stack((accuracy, satisfaction)))
+        self.sat_points.set_sizes(40 * np.sqrt(counts))
+        self.sat_text.set_text(f"r = {self.stats.correlation():.2f}  (n = {self.stats.n})")
+        
+        self.mae_canvas.draw_idle()
+        self.sat_canvas.draw_idle()
+        self.analysis_win.deiconify()
+        self.analysis_win.lift()
+    
+    def create_analysis_window(self):
+        """Build the analysis window and its two figures; closing it only hides it"""
+        self.analysis_win = tk.Toplevel(self.root)
+        self.analysis_win.title("Analysis Results")
+        self.analysis_win.geometry("800x600")
+        self.analysis_win.protocol("WM_DELETE_WINDOW", self.analysis_win.withdraw)
         
         # Create tabs
-        notebook = ttk.Notebook(analysis_win)
+        notebook = ttk.Notebook(self.analysis_win)
         
         # MAE Tab
         mae_frame = ttk.Frame(notebook)
         notebook.add(mae_frame, text="Attribute Errors")
         
         fig1, ax1 = plt.subplots(figsize=(6, 4))
-        ax1.bar(mae.keys(), mae.values())
+        self.mae_bars = ax1.bar(self.attributes, np.zeros(len(self.attributes)))
+        self.mae_spread = ax1.vlines(range(len(self.attributes)), 0, 0, colors='black')
         ax1.set_title("Mean Absolute Error by Attribute")
         ax1.set_ylabel("MAE")
         ax1.set_ylim(0, 1)
         
-        canvas1 = FigureCanvasTkAgg(fig1, master=mae_frame)
-        canvas1.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.mae_canvas = FigureCanvasTkAgg(fig1, master=mae_frame)
+        self.mae_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
         
         # Satisfaction vs Accuracy Tab
         sat_frame = ttk.Frame(notebook)
         notebook.add(sat_frame, text="Satisfaction Analysis")
         
+        # One marker per (accuracy bin, rating) cell, sized by the number of trials
         fig2, ax2 = plt.subplots(figsize=(6, 4))
-        ax2.scatter(avg_accuracy, satisfaction)
+        self.sat_points = ax2.scatter([], [])
         ax2.set_title("Satisfaction vs Prediction Accuracy")
         ax2.set_xlabel("Accuracy (1 - MAE)")
         ax2.set_ylabel("Satisfaction Rating")
         ax2.set_xlim(0, 1)
         ax2.set_ylim(0.5, 5.5)
         
-        # Calculate correlation
-        r = np.corrcoef(avg_accuracy, satisfaction)[0, 1]
-        ax2.text(0.05, 0.95, f"r = {r:.2f}", transform=ax2.transAxes, 
+        self.sat_text = ax2.text(0.05, 0.95, "", transform=ax2.transAxes, 
                 verticalalignment='top', bbox=dict(facecolor='white', alpha=0.8))
         
-        canvas2 = FigureCanvasTkAgg(fig2, master=sat_frame)
-        canvas2.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.sat_canvas = FigureCanvasTkAgg(fig2, master=sat_frame)
+        self.sat_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
         
         notebook.pack(fill=tk.BOTH, expand=True)
 
@@ -0,0 +1,31 @@
+from trial_log import TrialLog
+
+
+def trial(n):
+    return {"trial_number": n, "role": "Delivery", "satisfaction": 3}
+
+
+def test_append_load_and_compact(tmp_path):
+    log = TrialLog(1234, directory=str(tmp_path))
+    for n in (1, 2):
+        log.append(trial(n))
+    assert log.load()["current_trial"] == 2
+
+    compacted = log.compact()
+    assert [t["trial_number"] for t in compacted["trials"]] == [1, 2]
+    log.append(trial(3))
+    data = TrialLog(1234, directory=str(tmp_path)).load()
+    assert [t["trial_number"] for t in data["trials"]] == [1, 2, 3] and data["current_trial"] == 3
+
+
+def test_torn_last_line_and_interrupted_compaction(tmp_path):
+    log = TrialLog(7, directory=str(tmp_path))
+    for n in (1, 2):
+        log.append(trial(n))
+    log.compact()
+    # Compaction died before removing the log: its trials are already in the JSON file
+    log.append(trial(2))
+    log.append(trial(3))
+    with open(log.log_path, "a") as f:
+        f.write('{"trial_number": 4, "ro')
+    assert [t["trial_number"] for t in log.load()["trials"]] == [1, 2, 3]
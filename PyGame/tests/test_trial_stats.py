@@ -0,0 +1,28 @@
+import numpy as np
+
+from trial_stats import TrialStats
+
+ATTRIBUTES = ["Energy", "Pace", "Safety", "Reliability", "Intelligence"]
+
+
+def test_running_statistics_match_numpy():
+    rng = np.random.default_rng(0)
+    diffs = rng.uniform(-0.5, 0.5, (40, len(ATTRIBUTES)))
+    satisfaction = rng.integers(1, 6, 40)
+    stats = TrialStats(ATTRIBUTES)
+    for d, s in zip(diffs, satisfaction):
+        stats.add({"differences": dict(zip(ATTRIBUTES, d)), "satisfaction": int(s)})
+
+    accuracy = 1 - diffs.mean(axis=1)
+    np.testing.assert_allclose(list(stats.mae().values()), np.abs(diffs).mean(axis=0))
+    np.testing.assert_allclose(list(stats.mae_std().values()), np.abs(diffs).std(axis=0, ddof=1))
+    assert np.isclose(stats.covariance(), np.cov(accuracy, satisfaction)[0, 1])
+    assert np.isclose(stats.correlation(), np.corrcoef(accuracy, satisfaction)[0, 1])
+    acc, sat, counts = stats.grid()
+    assert counts.sum() == 40 and len(acc) == len(sat) == len(counts)
+
+
+def test_undefined_statistics_are_nan():
+    stats = TrialStats(ATTRIBUTES)
+    stats.add({"differences": dict.fromkeys(ATTRIBUTES, 0.1), "satisfaction": 4})
+    assert np.isnan(stats.covariance()) and np.isnan(stats.correlation())
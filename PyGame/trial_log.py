@@ -0,0 +1,57 @@
+import json
+import os
+
+
+class TrialLog:
+    """
+    Per-participant trial storage: one JSON line appended per saved trial, compacted
+    into the consolidated participant_<id>.json at session end.
+    """
+
+    def __init__(self, participant_id, directory="participant_data"):
+        self.participant_id = int(participant_id)
+        self.directory = directory
+        base = os.path.join(directory, f"participant_{self.participant_id}")
+        self.log_path = base + ".jsonl"
+        self.json_path = base + ".json"
+        os.makedirs(directory, exist_ok=True)
+
+    def append(self, trial_data):
+        """Write one trial record; cost does not depend on how many trials came before"""
+        with open(self.log_path, 'a') as f:
+            f.write(json.dumps(trial_data) + "\n")
+            f.flush()
+
+    def load(self):
+        """Participant data from the consolidated file plus any trials logged since"""
+        data = {"participant_id": self.participant_id, "trials": [], "current_trial": 0}
+        if os.path.isfile(self.json_path):
+            with open(self.json_path) as f:
+                data = json.load(f)
+        # Trials already folded in (compaction interrupted before the log was removed)
+        last = data["trials"][-1]["trial_number"] if data["trials"] else 0
+        if os.path.isfile(self.log_path):
+            with open(self.log_path) as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        trial = json.loads(line)
+                    except json.JSONDecodeError:
+                        break  # partial last line from an interrupted save
+                    if trial["trial_number"] > last:
+                        data["trials"].append(trial)
+        data["current_trial"] = len(data["trials"])
+        return data
+
+    def compact(self):
+        """Fold the log into participant_<id>.json and start a fresh log"""
+        data = self.load()
+        tmp = self.json_path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, self.json_path)
+        if os.path.isfile(self.log_path):
+            os.remove(self.log_path)
+        return data
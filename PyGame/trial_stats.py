@@ -0,0 +1,74 @@
+import numpy as np
+
+
+class TrialStats:
+    """
+    Running statistics over saved trials, updated in O(1) per trial.
+
+    Per attribute: mean and variance (Welford) of the absolute difference between
+    the adjusted and predicted value. Across trials: means, variances and covariance
+    of accuracy (1 - mean difference) and satisfaction, plus a fixed-size count grid
+    of (accuracy, satisfaction) pairs for plotting.
+    """
+
+    def __init__(self, attributes, accuracy_bins=20, ratings=(1, 2, 3, 4, 5)):
+        self.attributes = list(attributes)
+        self.n = 0
+        self.abs_mean = np.zeros(len(self.attributes))
+        self.abs_m2 = np.zeros(len(self.attributes))
+        self.acc_mean = 0.0
+        self.sat_mean = 0.0
+        self.acc_m2 = 0.0
+        self.sat_m2 = 0.0
+        self.co_moment = 0.0
+        self.ratings = np.asarray(ratings)
+        self.bin_edges = np.linspace(0, 1, accuracy_bins + 1)
+        self.counts = np.zeros((accuracy_bins, len(ratings)), dtype=int)
+
+    def add(self, trial):
+        """Fold one trial record (as written by save_configuration) into the statistics"""
+        diffs = np.array([trial["differences"][attr] for attr in self.attributes], dtype=float)
+        accuracy = 1 - diffs.mean()
+        satisfaction = float(trial["satisfaction"])
+        self.n += 1
+
+        delta = np.abs(diffs) - self.abs_mean
+        self.abs_mean += delta / self.n
+        self.abs_m2 += delta * (np.abs(diffs) - self.abs_mean)
+
+        d_acc = accuracy - self.acc_mean
+        d_sat = satisfaction - self.sat_mean
+        self.acc_mean += d_acc / self.n
+        self.sat_mean += d_sat / self.n
+        self.acc_m2 += d_acc * (accuracy - self.acc_mean)
+        self.sat_m2 += d_sat * (satisfaction - self.sat_mean)
+        self.co_moment += d_acc * (satisfaction - self.sat_mean)
+
+        # Accuracies outside [0, 1] land in the edge bins, as on the clipped plot axis
+        i = min(max(np.searchsorted(self.bin_edges, accuracy, side="right") - 1, 0), len(self.counts) - 1)
+        j = np.searchsorted(self.ratings, satisfaction)
+        if j < len(self.ratings) and self.ratings[j] == satisfaction:
+            self.counts[i, j] += 1
+
+    def mae(self):
+        return dict(zip(self.attributes, self.abs_mean))
+
+    def mae_std(self):
+        """Sample standard deviation of the absolute differences per attribute"""
+        var = self.abs_m2 / (self.n - 1) if self.n > 1 else np.zeros_like(self.abs_m2)
+        return dict(zip(self.attributes, np.sqrt(var)))
+
+    def covariance(self):
+        return self.co_moment / (self.n - 1) if self.n > 1 else float("nan")
+
+    def correlation(self):
+        """Pearson r of accuracy vs satisfaction (nan while undefined, like np.corrcoef)"""
+        if self.n < 2 or self.acc_m2 <= 0 or self.sat_m2 <= 0:
+            return float("nan")
+        return self.co_moment / np.sqrt(self.acc_m2 * self.sat_m2)
+
+    def grid(self):
+        """Bin centres, ratings and counts (flattened) of the accuracy/satisfaction grid"""
+        centres = 0.5 * (self.bin_edges[:-1] + self.bin_edges[1:])
+        acc, sat = np.meshgrid(centres, self.ratings, indexing="ij")
+        return acc.ravel(), sat.ravel(), self.counts.ravel()
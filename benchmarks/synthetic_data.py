@@ -0,0 +1,63 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "MATLAB_OptimaDFT_RobotAllocation"))
+
+from dft_dynamics import ATTRIBUTES  # noqa: E402
+from dft_estimator import APOLLO_BETA, PARAM_NAMES, simulate_choices  # noqa: E402
+
+COLUMNS = (["trial", "participantid", "datetime", "staketype", "choice", "timespent"]
+           + [f"robot{i}{attr}" for i in range(1, 4) for attr in ATTRIBUTES])
+
+
+def generate_pairing_data(n_participants=10, n_trials=30, theta=None, seed=0, first_participant=1001):
+    """
+    Synthetic pairing data in the testTrial_Resource_Allocation_AllPairing.csv schema,
+    with choices drawn from the DFT model
+    :param theta: raw parameters in PARAM_NAMES order used to draw the choices
+                  (APOLLO_BETA defaults)
+    :return: DataFrame with n_participants * n_trials rows
+    """
+    rng = np.random.default_rng(seed)
+    n = n_participants * n_trials
+    if theta is None:
+        theta = np.array([APOLLO_BETA[name] for name in PARAM_NAMES], dtype=float)
+
+    # Attribute levels in 0.05 steps over the range used in the study
+    M = np.round(rng.integers(6, 19, size=(n, 3, len(ATTRIBUTES))) * 0.05, 2)
+    start = datetime(2025, 4, 10, 12, 0, 0)
+    data = {
+        "trial": np.tile(np.arange(1, n_trials + 1), n_participants),
+        "participantid": np.repeat(np.arange(first_participant, first_participant + n_participants), n_trials),
+        "datetime": [int((start + timedelta(seconds=int(s))).strftime("%Y%m%d%H%M%S")) for s in range(n)],
+        "staketype": rng.choice(["high", "low"], n),
+        "choice": simulate_choices(theta, M, seed=seed),
+        "timespent": rng.integers(2, 11, n),
+    }
+    for i in range(3):
+        for k, attr in enumerate(ATTRIBUTES):
+            data[f"robot{i + 1}{attr}"] = M[:, i, k]
+    return pd.DataFrame(data, columns=COLUMNS)
+
+
+def generate_save_results_rows(n, seed=0):
+    """Rows for Figma/Version1 /save_results (FIELDS in run.py)"""
+    rng = np.random.default_rng(seed)
+    return [{
+        "trial_number": i + 1,
+        "payoff_A_event1": int(rng.integers(0, 10)), "payoff_A_event2": int(rng.integers(0, 10)),
+        "payoff_B_event1": int(rng.integers(0, 10)), "payoff_B_event2": int(rng.integers(0, 10)),
+        "choice": str(rng.choice(["A", "B"])), "chosen_payoff": int(rng.integers(0, 10)),
+        "current_amount": int(rng.integers(0, 100)), "time_taken": round(float(rng.uniform(1, 10)), 2),
+    } for i in range(n)]
+
+
+if __name__ == "__main__":
+    n_participants = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    n_trials = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    generate_pairing_data(n_participants, n_trials).to_csv(sys.stdout, index=False)